@@ -1,7 +1,11 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Header, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
+import json
 import uuid
-from backend.services.conversation_service import handle_chat
+from backend.services.chat_jobs import ChatJob, chat_jobs
+from backend.services.conversation_service import handle_chat, stream_chat
+from backend.services.deadline import DEADLINE_HEADER, Deadline
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
@@ -13,9 +17,57 @@ class ChatIn(BaseModel):
     temperature: float | None = 0.0
 
 @router.post("/")
-async def chat_endpoint(payload: ChatIn):
+async def chat_endpoint(payload: ChatIn, deadline: str | None = Header(None, alias=DEADLINE_HEADER)):
     session_id = payload.session_id or str(uuid.uuid4())
     out = await handle_chat(payload.message, session_id=session_id, user_id=payload.user_id,
-                            max_tokens=payload.max_tokens or 512, temperature=payload.temperature or 0.0)
+                            max_tokens=payload.max_tokens or 512, temperature=payload.temperature or 0.0,
+                            deadline=Deadline.from_header(deadline))
     out["session_id"] = session_id
     return out
+
+@router.post("/stream")
+async def chat_stream_endpoint(payload: ChatIn, deadline: str | None = Header(None, alias=DEADLINE_HEADER)):
+    """Resposta em Server-Sent Events: `meta`, vários `token` e um `done` final."""
+    session_id = payload.session_id or str(uuid.uuid4())
+    items = stream_chat(payload.message, session_id=session_id, user_id=payload.user_id,
+                        max_tokens=payload.max_tokens or 512, temperature=payload.temperature or 0.0,
+                        deadline=Deadline.from_header(deadline))
+    # o primeiro evento é obtido antes de abrir o stream: recusas por sobrecarga viram 503
+    # e timeouts impostos pelo prazo viram 504
+    first = await items.__anext__()
+
+    def encode(item):
+        event = item.pop("event")
+        return f"event: {event}\ndata: {json.dumps(item, ensure_ascii=False, default=str)}\n\n"
+
+    async def events():
+        yield encode(first)
+        async for item in items:
+            yield encode(item)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post("/jobs", status_code=202)
+async def chat_job_submit(payload: ChatIn, request: Request):
+    """Aceita a mensagem para processamento em segundo plano; consulte `GET /chat/jobs/{id}`."""
+    job = chat_jobs.submit(ChatJob(
+        message=payload.message,
+        session_id=payload.session_id or str(uuid.uuid4()),
+        user_id=payload.user_id,
+        max_tokens=payload.max_tokens or 512,
+        temperature=payload.temperature or 0.0,
+    ))
+    location = request.url_for("chat_job_status", job_id=job.id).path
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job.id, "status": job.status, "session_id": job.session_id, "status_url": location},
+        headers={"Location": location},
+    )
+
+@router.get("/jobs/{job_id}")
+async def chat_job_status(job_id: str):
+    return chat_jobs.get(job_id).to_dict()
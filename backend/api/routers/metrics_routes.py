@@ -0,0 +1,32 @@
+from fastapi import APIRouter
+
+from backend.services.admission import admission_controller
+from backend.services.answer_cache import answer_cache
+from backend.services.chat_jobs import chat_jobs
+from backend.services.chat_log_writer import chat_log_writer
+from backend.services.circuit_breaker import model_breaker
+from backend.services.embedding_service import embedding_service
+from backend.services.http_cache import response_cache
+from backend.services.ollama_client import generation_flight
+from backend.services.ollama_pool import ollama_pool
+from backend.services.politico_index import politico_index
+from backend.services.session_context import session_contexts
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+@router.get("/")
+async def get_metrics():
+    '''Retorna métricas internas dos serviços'''
+    return {
+        "embeddings": embedding_service.stats(),
+        "ollama": ollama_pool.stats(),
+        "model_breaker": model_breaker.stats(),
+        "admission": admission_controller.stats(),
+        "chat_jobs": chat_jobs.stats(),
+        "chat_log_writer": chat_log_writer.stats(),
+        "answer_cache": answer_cache.stats(),
+        "generation_single_flight": generation_flight.stats(),
+        "session_contexts": session_contexts.stats(),
+        "politico_index": politico_index.stats(),
+        "http_cache": response_cache.stats(),
+    }
@@ -1,29 +1,67 @@
 """Endpoints de políticos."""
 from uuid import UUID
 import logging
-from typing import List
-from fastapi import APIRouter, HTTPException, status, Depends
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, status, Depends
 from fastapi.responses import Response
 from sqlalchemy.orm import Session
 from backend.db.deps import get_session
 
 from backend.schemas.politico import PoliticoCreate, PoliticoUpdate, PoliticoRead
-from backend.services.politico_service import PoliticoService
+from backend.services.http_cache import response_cache
+from backend.services.politico_service import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, PoliticoService
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/politicos", tags=["políticos"])
 
+# respostas de leitura em cache; as rotas de escrita abaixo invalidam a tag
+CACHE_TAG = "politicos"
+CACHE_TABLES = ("politicos",)
+
 
 @router.get(
     "/",
-    response_model=List[PoliticoRead],
-    summary="Lista todos os políticos",
-    description="Retorna uma lista com todos os políticos cadastrados no sistema."
+    response_model=List[Dict[str, Any]],
+    summary="Lista políticos",
+    description=(
+        "Retorna os políticos ordenados por nome; sem `limit` nem `cursor`, todos de uma vez. "
+        "Com `limit` ou `cursor`, retorna uma página e o cursor da próxima vem no cabeçalho "
+        "`X-Next-Cursor` (ausente na última página). `fields` escolhe as colunas de "
+        "`PoliticoRead`, separadas por vírgula; por padrão o embedding não é incluído."
+    ),
+    responses={400: {"description": "Cursor ou campos inválidos"}}
 )
-async def listar_politicos(db: Session = Depends(get_session)) -> List[PoliticoRead]:
-    """Lista todos os políticos cadastrados."""
-    logger.info("Listando todos os políticos")
-    return PoliticoService.listar_politicos(db)
+async def listar_politicos(
+    request: Request,
+    limit: Optional[int] = Query(
+        None, ge=1, le=MAX_PAGE_SIZE, description=f"Tamanho da página (padrão {DEFAULT_PAGE_SIZE} com `cursor`)"
+    ),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Ex.: id,nome,partido,uf"),
+    partido: Optional[str] = None,
+    uf: Optional[str] = None,
+    cargo: Optional[str] = None,
+    ativo: Optional[bool] = None,
+    db: Session = Depends(get_session),
+) -> Response:
+    """Lista políticos com paginação por cursor, projeção de campos e filtros."""
+    page = {}
+
+    def build():
+        logger.info("Listando políticos (limit=%s, cursor=%s)", limit, bool(cursor))
+        rows, page["next_cursor"] = PoliticoService.listar_politicos_paginado(
+            db, limit=limit, cursor=cursor, fields=fields, partido=partido, uf=uf, cargo=cargo, ativo=ativo
+        )
+        return rows
+
+    return await response_cache.respond(
+        request,
+        key=f"politicos:{sorted(request.query_params.multi_items())}",
+        build=build,
+        tag=CACHE_TAG,
+        tables=CACHE_TABLES,
+        headers=lambda _: {"X-Next-Cursor": page["next_cursor"]} if page.get("next_cursor") else {},
+    )
 
 
 @router.get(
@@ -64,7 +102,9 @@ async def buscar_politico(politico_id: UUID, db: Session = Depends(get_session))
 async def criar_politico( politico: PoliticoCreate, db : Session = Depends(get_session)) -> PoliticoRead:
     """Cria um novo político no banco de dados."""
     logger.info("Criando novo político: %s", politico.nome)
-    return PoliticoService.criar_politico(db, politico)
+    criado = PoliticoService.criar_politico(db, politico)
+    response_cache.invalidate(CACHE_TAG)
+    return criado
 
 @router.put(
     "/{politico_id}",
@@ -80,7 +120,9 @@ async def criar_politico( politico: PoliticoCreate, db : Session = Depends(get_s
 async def atualizar_politico(politico_id: UUID, politico: PoliticoUpdate, db : Session = Depends(get_session)) -> PoliticoRead:
     """Atualiza um político existente pelo ID."""
     logger.info("Atualizando político ID: %s", politico_id)
-    return PoliticoService.atualizar_politico(db, politico_id, politico)
+    atualizado = PoliticoService.atualizar_politico(db, politico_id, politico)
+    response_cache.invalidate(CACHE_TAG)
+    return atualizado
 
 
 @router.patch(
@@ -101,6 +143,7 @@ async def upsert_politico(politico_id: UUID, politico: PoliticoUpdate, db : Sess
     politico_resultado, foi_criado = PoliticoService.criar_ou_atualizar_politico(
         db, politico_id, politico
     )
+    response_cache.invalidate(CACHE_TAG)
 
     if foi_criado:
         logger.info("Político criado com ID: %s", politico_id)
@@ -126,6 +169,7 @@ async def deletar_politico(politico_id: UUID, db : Session = Depends(get_session
     logger.info("Deletando político ID: %s", politico_id)
 
     PoliticoService.deletar_politico(db, politico_id)
+    response_cache.invalidate(CACHE_TAG)
 
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
@@ -140,7 +184,16 @@ async def deletar_politico(politico_id: UUID, db : Session = Depends(get_session
         200: {"description": "Lista de políticos do partido"}
     }
 )
-async def listar_politicos_por_partido(partido: str, db : Session = Depends(get_session)) -> List[PoliticoRead]:
+async def listar_politicos_por_partido(partido: str, request: Request, db : Session = Depends(get_session)) -> Response:
     """Lista políticos de um partido específico."""
-    logger.info("Listando políticos do partido: %s", partido)
-    return PoliticoService.buscar_politicos_por_partido(db, partido)
+    def build():
+        logger.info("Listando políticos do partido: %s", partido)
+        return PoliticoService.buscar_politicos_por_partido(db, partido)
+
+    return await response_cache.respond(
+        request,
+        key=f"politicos:partido:{partido.strip().lower()}",
+        build=build,
+        tag=CACHE_TAG,
+        tables=CACHE_TABLES,
+    )
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 
 from backend.db.deps import get_session
+from backend.services.http_cache import response_cache
 from backend.services.prototipo_service import PrototipoService
 from backend.schemas.prototipo import (
     QuestionarioRequest,
@@ -15,9 +16,11 @@ prototipo_service = PrototipoService()
 
 @router.get("", response_model=PrototipoResponse)
 @router.get("/", response_model=PrototipoResponse)
-async def get_votacoes():
-    '''Retorna as votações do protótipo'''
-    return prototipo_service.get_votacoes_prototipo()
+async def get_votacoes(request: Request):
+    '''Retorna as votações do protótipo (conteúdo fixo: serializado uma vez e servido do cache)'''
+    return await response_cache.respond(
+        request, key="prototipo:votacoes", build=prototipo_service.get_votacoes_prototipo, tag="prototipo"
+    )
 
 @router.post("/calcular-afinidade", response_model=ResultadoQuestionario)
 async def calcular_afinidade(
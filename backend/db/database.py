@@ -2,6 +2,7 @@
 from os import getenv
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 def get_database_url() -> str:
@@ -19,6 +20,25 @@ def get_database_url() -> str:
     raise RuntimeError("Nenhuma URL de banco de dados encontrada nas variáveis de ambiente.")
 
 
+def get_async_database_url() -> str:
+    """Converte a URL do banco para o driver asyncpg."""
+    url = get_database_url()
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
 engine = create_engine(get_database_url(), echo=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+async_engine = create_async_engine(
+    get_async_database_url(),
+    pool_size=int(getenv("DB_ASYNC_POOL_SIZE", "10")),
+    max_overflow=int(getenv("DB_ASYNC_MAX_OVERFLOW", "10")),
+    pool_pre_ping=True,
+)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
 Base = declarative_base()
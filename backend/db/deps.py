@@ -1,6 +1,7 @@
-from typing import Generator
+from typing import AsyncGenerator, Generator
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from backend.db.database import SessionLocal
+from backend.db.database import AsyncSessionLocal, SessionLocal
 
 def get_session() -> Generator[Session, None, None]:
     db = SessionLocal()
@@ -8,3 +9,8 @@ def get_session() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,183 @@
+"""Gerenciamento dos índices vetoriais (pgvector) alinhados à distância de cosseno."""
+import os
+import time
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+INDEX_METHOD = os.getenv("VECTOR_INDEX_METHOD", "hnsw")
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "40"))
+IVFFLAT_PROBES = int(os.getenv("IVFFLAT_PROBES", "10"))
+IVFFLAT_MIN_LISTS = 10
+
+
+@dataclass(frozen=True)
+class VectorIndexSpec:
+    name: str
+    table: str
+    column: str
+
+
+VECTOR_INDEXES: List[VectorIndexSpec] = [
+    VectorIndexSpec("politicos_bio_embedding_idx", "politicos", "embedding_biografia"),
+    VectorIndexSpec("politicos_embedding_idx", "politicos", "embedding_ideologia"),
+    VectorIndexSpec("documentos_embedding_idx", "documentos_politicos", "embedding_documento"),
+    VectorIndexSpec("documentos_titulo_embedding_idx", "documentos_politicos", "embedding_titulo"),
+    VectorIndexSpec("documentos_ementa_embedding_idx", "documentos_politicos", "embedding_ementa"),
+    VectorIndexSpec("usuarios_embedding_idx", "usuarios_perfis_ideologicos", "embedding_ideologia"),
+]
+
+
+def get_spec(name: str) -> VectorIndexSpec:
+    for spec in VECTOR_INDEXES:
+        if spec.name == name:
+            return spec
+    raise ValueError(f"Índice vetorial desconhecido: {name}")
+
+
+_SEARCH_PARAMS_SQL = text(
+    "SELECT set_config('hnsw.ef_search', :ef, true), set_config('ivfflat.probes', :probes, true)"
+)
+
+
+def apply_search_params(db: Session, ef_search: int = HNSW_EF_SEARCH, probes: int = IVFFLAT_PROBES) -> None:
+    """Define `hnsw.ef_search` e `ivfflat.probes` apenas para a transação corrente."""
+    db.execute(_SEARCH_PARAMS_SQL, {"ef": str(ef_search), "probes": str(probes)})
+
+
+async def apply_search_params_async(
+    db: AsyncSession, ef_search: int = HNSW_EF_SEARCH, probes: int = IVFFLAT_PROBES
+) -> None:
+    """Versão assíncrona de `apply_search_params`."""
+    await db.execute(_SEARCH_PARAMS_SQL, {"ef": str(ef_search), "probes": str(probes)})
+
+
+def _ivfflat_lists(conn: Connection, spec: VectorIndexSpec) -> int:
+    rows = conn.execute(
+        text(f"SELECT count(*) FROM {spec.table} WHERE {spec.column} IS NOT NULL")
+    ).scalar_one()
+    # recomendação do pgvector: linhas/1000 até 1M linhas
+    return max(IVFFLAT_MIN_LISTS, rows // 1000)
+
+
+def index_ddl(spec: VectorIndexSpec, method: str, name: Optional[str] = None, lists: Optional[int] = None) -> str:
+    name = name or spec.name
+    if method == "hnsw":
+        options = f"m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION}"
+    elif method == "ivfflat":
+        options = f"lists = {lists or IVFFLAT_MIN_LISTS}"
+    else:
+        raise ValueError(f"Método de índice inválido: {method}")
+    return (
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {spec.table} "
+        f"USING {method} ({spec.column} vector_cosine_ops) WITH ({options})"
+    )
+
+
+def _autocommit(engine: Engine) -> Connection:
+    # CREATE/DROP INDEX CONCURRENTLY não pode rodar dentro de uma transação
+    return engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+
+
+def create_index(engine: Engine, spec: VectorIndexSpec, method: str = INDEX_METHOD) -> float:
+    """Cria o índice se não existir e retorna o tempo de construção em segundos."""
+    with _autocommit(engine) as conn:
+        lists = _ivfflat_lists(conn, spec) if method == "ivfflat" else None
+        started = time.perf_counter()
+        conn.execute(text(index_ddl(spec, method, lists=lists)))
+        elapsed = time.perf_counter() - started
+    logger.info(f"Índice {spec.name} ({method}) criado em {elapsed:.2f}s")
+    return elapsed
+
+
+def rebuild_index(engine: Engine, spec: VectorIndexSpec, method: str = INDEX_METHOD) -> float:
+    """
+    Reconstrói o índice com operador de cosseno sem deixar a coluna sem índice:
+    cria uma cópia nova, remove a antiga e renomeia.
+    """
+    tmp_name = f"{spec.name}_new"
+    with _autocommit(engine) as conn:
+        lists = _ivfflat_lists(conn, spec) if method == "ivfflat" else None
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {tmp_name}"))
+        started = time.perf_counter()
+        conn.execute(text(index_ddl(spec, method, name=tmp_name, lists=lists)))
+        elapsed = time.perf_counter() - started
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {spec.name}"))
+        conn.execute(text(f"ALTER INDEX {tmp_name} RENAME TO {spec.name}"))
+    logger.info(f"Índice {spec.name} ({method}) reconstruído em {elapsed:.2f}s")
+    return elapsed
+
+
+def inspect_index(conn: Connection, spec: VectorIndexSpec) -> Dict[str, Any]:
+    """Retorna definição, uso e tamanho do índice e se ele atende a buscas por cosseno."""
+    row = conn.execute(
+        text(
+            """
+            SELECT i.indexdef,
+                   coalesce(s.idx_scan, 0) AS idx_scan,
+                   coalesce(s.idx_tup_read, 0) AS idx_tup_read,
+                   pg_relation_size(c.oid) AS size_bytes,
+                   ix.indisvalid AS valid
+            FROM pg_indexes i
+            JOIN pg_class c ON c.relname = i.indexname
+            JOIN pg_index ix ON ix.indexrelid = c.oid
+            LEFT JOIN pg_stat_user_indexes s ON s.indexrelid = c.oid
+            WHERE i.tablename = :table AND i.indexname = :name
+            """
+        ),
+        {"table": spec.table, "name": spec.name},
+    ).mappings().first()
+
+    if row is None:
+        return {"name": spec.name, "table": spec.table, "column": spec.column, "exists": False, "ok": False}
+
+    indexdef = row["indexdef"].lower()
+    method = "hnsw" if "using hnsw" in indexdef else "ivfflat" if "using ivfflat" in indexdef else "other"
+    cosine = "vector_cosine_ops" in indexdef
+    return {
+        "name": spec.name,
+        "table": spec.table,
+        "column": spec.column,
+        "exists": True,
+        "method": method,
+        "cosine": cosine,
+        "valid": bool(row["valid"]),
+        "ok": cosine and method in ("hnsw", "ivfflat") and bool(row["valid"]),
+        "idx_scan": row["idx_scan"],
+        "idx_tup_read": row["idx_tup_read"],
+        "size_bytes": row["size_bytes"],
+    }
+
+
+def explain_uses_index(conn: Connection, spec: VectorIndexSpec) -> bool:
+    """Confere no plano de execução se uma busca k-NN por cosseno pode usar o índice."""
+    conn.execute(text("SET LOCAL enable_seqscan = off"))
+    probe = "[" + ",".join(["1"] + ["0"] * 767) + "]"
+    plan = conn.execute(
+        text(
+            f"EXPLAIN SELECT id FROM {spec.table} "
+            f"ORDER BY {spec.column} <=> CAST(:q AS vector) LIMIT 5"
+        ),
+        {"q": probe},
+    ).scalars().all()
+    return any(spec.name in line for line in plan)
+
+
+def verify_indexes(engine: Engine, specs: Optional[List[VectorIndexSpec]] = None) -> List[Dict[str, Any]]:
+    with engine.connect() as conn:
+        results = []
+        for spec in specs or VECTOR_INDEXES:
+            info = inspect_index(conn, spec)
+            info["used_by_planner"] = explain_uses_index(conn, spec) if info["exists"] else False
+            results.append(info)
+        conn.rollback()
+        return results
@@ -1,9 +1,30 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from backend.api.routers import politicos_routes, prototipo_routes, chat_routes
+from backend.api.routers import politicos_routes, prototipo_routes, chat_routes, metrics_routes
+from backend.db.database import async_engine
+from backend.services.chat_jobs import chat_jobs
+from backend.services.chat_log_writer import chat_log_writer
+from backend.services.embedding_service import embedding_service
+from backend.services.ollama_pool import ollama_pool
+from backend.services.politico_index import politico_index
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI(title="Servidor da Iris")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await ollama_pool.start()
+    await chat_jobs.start()
+    await politico_index.start()
+    yield
+    await chat_jobs.close()
+    await chat_log_writer.close()
+    await ollama_pool.close()
+    await embedding_service.batcher.close()
+    await async_engine.dispose()
+
+
+app = FastAPI(title="Servidor da Iris", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -11,10 +32,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.include_router(politicos_routes.router, prefix="/api/v1")
 app.include_router(prototipo_routes.router, prefix="/api/v1")
 app.include_router(chat_routes.router, prefix="/api/v1")
+app.include_router(metrics_routes.router, prefix="/api/v1")
 
 app.mount("/", StaticFiles(directory="backend/static", html=True), name="static")
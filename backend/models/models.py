@@ -1,5 +1,6 @@
 import sqlalchemy as sa
-from sqlalchemy.dialects.postgresql import UUID, JSONB, TIMESTAMP, BIGINT
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TIMESTAMP, BIGINT, TSVECTOR
+from sqlalchemy.orm import deferred
 from pgvector.sqlalchemy import Vector
 from backend.db.database import Base
 
@@ -23,6 +24,7 @@ class Politico(Base):
     ici = sa.Column(sa.Float)
     historico_ici = sa.Column(JSONB, default="{}")
     biografia_resumo = sa.Column(sa.Text)
+    busca_tsv = deferred(sa.Column(TSVECTOR))  # mantido por trigger; só usado nas buscas textuais
     created_at = sa.Column(TIMESTAMP(timezone=True), server_default=sa.text("now()"))
     updated_at = sa.Column(TIMESTAMP(timezone=True), server_default=sa.text("now()"))
 
@@ -41,6 +43,7 @@ class DocumentoPolitico(Base):
     embedding_documento = sa.Column(Vector(768))
     embedding_titulo = sa.Column(Vector(768))
     embedding_ementa = sa.Column(Vector(768))
+    busca_tsv = deferred(sa.Column(TSVECTOR))  # mantido por trigger; só usado nas buscas textuais
     created_at = sa.Column(TIMESTAMP(timezone=True), server_default=sa.text("now()"))
     updated_at = sa.Column(TIMESTAMP(timezone=True), server_default=sa.text("now()"))
 
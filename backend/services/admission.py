@@ -0,0 +1,174 @@
+"""
+Controle de admissão das gerações no Ollama: limita as chamadas simultâneas e mantém
+uma fila de espera limitada e com prioridade, recusando rápido (503) sob sobrecarga.
+"""
+
+import os
+import math
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from backend.services.deadline import DeadlineExceeded
+from backend.services.ollama_pool import MODEL_SERVERS
+
+logger = logging.getLogger(__name__)
+
+# por worker; por padrão duas gerações simultâneas por servidor Ollama do pool
+MAX_IN_FLIGHT = int(os.getenv("OLLAMA_MAX_IN_FLIGHT", str(2 * max(1, len(MODEL_SERVERS)))))
+MAX_QUEUE = int(os.getenv("OLLAMA_MAX_QUEUE", "16"))
+QUEUE_TIMEOUT = float(os.getenv("OLLAMA_QUEUE_TIMEOUT", "30"))
+
+# valores menores são atendidos primeiro
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+
+class OverloadedError(HTTPException):
+    """Geração recusada por sobrecarga; vira 503 com `Retry-After` na resposta."""
+
+    def __init__(self, reason: str, retry_after: int) -> None:
+        super().__init__(
+            status_code=503,
+            detail=f"Servidor do modelo sobrecarregado ({reason}). Tente novamente em instantes.",
+            headers={"Retry-After": str(retry_after)},
+        )
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Semáforo com fila de prioridade. Ao liberar uma vaga, ela é repassada diretamente
+    ao próximo da fila, de modo que o limite de chamadas simultâneas nunca é excedido.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        max_queue: int = MAX_QUEUE,
+        queue_timeout: float = QUEUE_TIMEOUT,
+    ) -> None:
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self._in_flight = 0
+        self._waiters: List[List[Any]] = []
+        self._seq = itertools.count()
+        self._admitted = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._total_hold = 0.0
+        self._released = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Estimativa em segundos para a fila atual escoar."""
+        avg_hold = self._total_hold / self._released if self._released else 5.0
+        rounds = (self.queue_depth + 1) / self.max_in_flight
+        return max(1, math.ceil(avg_hold * rounds))
+
+    def _record_admission(self, waited: float) -> None:
+        self._admitted += 1
+        self._total_wait += waited
+        self._max_wait = max(self._max_wait, waited)
+
+    def _remove_waiter(self, entry: List[Any]) -> None:
+        try:
+            self._waiters.remove(entry)
+            heapq.heapify(self._waiters)
+        except ValueError:
+            pass
+
+    async def acquire(self, priority: int = PRIORITY_INTERACTIVE, timeout: Optional[float] = None) -> None:
+        """
+        Aguarda uma vaga por até `queue_timeout` segundos. Um `timeout` menor (o prazo
+        restante da requisição) encurta a espera e, se esgotado, levanta `DeadlineExceeded`.
+        """
+        if self._in_flight < self.max_in_flight and not self._waiters:
+            self._in_flight += 1
+            self._record_admission(0.0)
+            return
+
+        if self.queue_depth >= self.max_queue:
+            self._rejected += 1
+            raise OverloadedError("fila cheia", self.retry_after())
+
+        started = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        entry = [priority, next(self._seq), future]
+        heapq.heappush(self._waiters, entry)
+
+        limited_by_deadline = timeout is not None and timeout < self.queue_timeout
+        try:
+            await asyncio.wait_for(
+                asyncio.shield(future), timeout=timeout if limited_by_deadline else self.queue_timeout
+            )
+        except asyncio.TimeoutError:
+            if not future.done():
+                future.cancel()
+                self._remove_waiter(entry)
+                self._timed_out += 1
+                if limited_by_deadline:
+                    raise DeadlineExceeded("Prazo da requisição esgotado na fila do modelo")
+                logger.warning(f"Geração recusada após {self.queue_timeout:.0f}s na fila")
+                raise OverloadedError("tempo de fila esgotado", self.retry_after())
+            # a vaga foi concedida no mesmo instante do timeout: segue admitido
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                future.cancel()
+                self._remove_waiter(entry)
+            raise
+
+        self._record_admission(time.perf_counter() - started)
+
+    def release(self, held_seconds: float = 0.0) -> None:
+        self._total_hold += held_seconds
+        self._released += 1
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(True)  # a vaga passa direto para o próximo
+                return
+        self._in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_INTERACTIVE, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        await self.acquire(priority, timeout)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self._in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "queue_timeout_seconds": self.queue_timeout,
+            "admitted": self._admitted,
+            "rejected": self._rejected,
+            "timed_out": self._timed_out,
+            "avg_wait_seconds": round(self._total_wait / self._admitted, 3) if self._admitted else 0.0,
+            "max_wait_seconds": round(self._max_wait, 3),
+            "avg_generation_seconds": round(self._total_hold / self._released, 3) if self._released else 0.0,
+            "retry_after_seconds": self.retry_after(),
+        }
+
+
+admission_controller = AdmissionController()
@@ -0,0 +1,82 @@
+"""
+Cache de respostas determinísticas (temperatura 0) do modelo
+"""
+
+import os
+import json
+import hashlib
+import logging
+from typing import Any, Dict, Optional
+
+from backend.services.data_version import data_version
+from backend.services.memory_cache import MemoryCache
+
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1024"))
+ANSWER_CACHE_MB = int(os.getenv("ANSWER_CACHE_MB", "16"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+class AnswerCache:
+    """
+    Guarda respostas válidas do modelo indexadas pelo hash do payload completo
+    (prompt, modelo e opções de geração). Só respostas com temperatura 0 entram,
+    e todo o cache é descartado quando a versão dos dados de origem muda.
+    """
+
+    def __init__(self) -> None:
+        self.cache = MemoryCache(
+            max_entries=ANSWER_CACHE_MAX_ENTRIES,
+            ttl_seconds=ANSWER_CACHE_TTL,
+            max_bytes=ANSWER_CACHE_MB * 1024 * 1024,
+        )
+        self._version: Optional[str] = None
+        self.invalidations = 0
+
+    @staticmethod
+    def cacheable(payload: Dict[str, Any]) -> bool:
+        return (
+            ANSWER_CACHE_ENABLED
+            and payload.get("options", {}).get("temperature") == 0
+            and "context" not in payload
+        )
+
+    @staticmethod
+    def key(payload: Dict[str, Any]) -> str:
+        material = {k: v for k, v in payload.items() if k not in ("stream", "context")}
+        return hashlib.sha256(json.dumps(material, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    async def _sync_version(self) -> None:
+        version = await data_version.current()
+        token = version.token() if version else None
+        if token != self._version:
+            if self._version is not None and len(self.cache):
+                logger.info(f"Dados alterados ({self._version} -> {token}); descartando cache de respostas")
+                self.invalidations += 1
+            self.cache.clear()
+            self._version = token
+
+    async def get(self, payload: Dict[str, Any]) -> Optional[str]:
+        if not self.cacheable(payload):
+            return None
+        await self._sync_version()
+        return self.cache.get(self.key(payload))
+
+    async def set(self, payload: Dict[str, Any], response: str) -> None:
+        if not self.cacheable(payload) or not response:
+            return
+        await self._sync_version()
+        self.cache.set(self.key(payload), response)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": ANSWER_CACHE_ENABLED,
+            "data_version": self._version,
+            "invalidations": self.invalidations,
+            **self.cache.stats(),
+        }
+
+
+answer_cache = AnswerCache()
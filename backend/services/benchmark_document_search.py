@@ -0,0 +1,76 @@
+"""
+Script para comparar os modos de busca semântica de documentos
+Uso: python -m backend.services.benchmark_document_search [--runs N] [consulta ...]
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from typing import Dict, List
+
+from backend.services.embedding_service import (
+    DOCUMENT_SEARCH_MODES,
+    embedding_service,
+    find_similar_documents,
+)
+
+logging.basicConfig(level=logging.WARNING)
+
+DEFAULT_QUERIES = [
+    "reforma tributária",
+    "demarcação de terras indígenas",
+    "marco temporal",
+    "privatização de empresas públicas",
+    "segurança pública e porte de armas",
+]
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark dos modos de find_similar_documents")
+    parser.add_argument("queries", nargs="*", default=DEFAULT_QUERIES)
+    parser.add_argument("--runs", type=int, default=5, help="Execuções por consulta e modo")
+    parser.add_argument("--limit", type=int, default=5)
+    return parser.parse_args(argv)
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def main(argv=None) -> None:
+    args = parse_args(argv)
+
+    # aquece modelo e cache de embeddings para medir apenas a busca
+    for query in args.queries:
+        await embedding_service.get_query_embedding(query)
+
+    latencies: Dict[str, List[float]] = {mode: [] for mode in DOCUMENT_SEARCH_MODES}
+    overlaps: Dict[str, List[float]] = {mode: [] for mode in DOCUMENT_SEARCH_MODES}
+
+    for query in args.queries:
+        baseline_ids = None
+        for mode in DOCUMENT_SEARCH_MODES:
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                docs = await find_similar_documents(query, limit=args.limit, mode=mode)
+                latencies[mode].append((time.perf_counter() - started) * 1000)
+
+            ids = {str(d["id"]) for d in docs}
+            if mode == "greatest":
+                baseline_ids = ids
+            if baseline_ids:
+                overlaps[mode].append(len(ids & baseline_ids) / len(baseline_ids))
+
+    print(f"{'modo':<10} {'média(ms)':>10} {'p95(ms)':>10} {'overlap@k':>10}")
+    for mode in DOCUMENT_SEARCH_MODES:
+        values = latencies[mode]
+        overlap = statistics.mean(overlaps[mode]) if overlaps[mode] else float("nan")
+        print(f"{mode:<10} {statistics.mean(values):>10.1f} {_percentile(values, 0.95):>10.1f} {overlap:>10.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,195 @@
+"""
+Chat assíncrono por jobs: o pedido é aceito na hora (202) e processado por um
+conjunto limitado de workers; o cliente consulta o resultado pelo id do job.
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+
+from backend.services.admission import MAX_IN_FLIGHT, OverloadedError
+from backend.services.conversation_service import handle_chat
+from backend.services.deadline import MAX_CHAT_DEADLINE, Deadline
+from backend.services.memory_cache import MemoryCache
+
+logger = logging.getLogger(__name__)
+
+# por padrão um worker por vaga de geração: mais que isso só aumentaria a fila de admissão
+CHAT_JOB_WORKERS = int(os.getenv("CHAT_JOB_WORKERS", str(MAX_IN_FLIGHT)))
+CHAT_JOB_MAX_PENDING = int(os.getenv("CHAT_JOB_MAX_PENDING", "256"))
+CHAT_JOB_TTL = float(os.getenv("CHAT_JOB_TTL", "600"))
+CHAT_JOB_MAX_RESULTS = int(os.getenv("CHAT_JOB_MAX_RESULTS", "1024"))
+CHAT_JOB_DEADLINE = float(os.getenv("CHAT_JOB_DEADLINE_SECONDS", str(MAX_CHAT_DEADLINE)))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+@dataclass
+class ChatJob:
+    message: str
+    session_id: str
+    user_id: Optional[str] = None
+    max_tokens: int = 512
+    temperature: float = 0.0
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    status: str = QUEUED
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "session_id": self.session_id,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class ChatJobManager:
+    """
+    Fila limitada de jobs de chat consumida por `workers` tasks. Jobs na fila ou em
+    execução ficam num dicionário que nunca é podado (no máximo `max_pending` mais
+    `workers` entradas), então um job aceito com 202 sempre roda. Só os resultados
+    finalizados vão para um store com TTL (`CHAT_JOB_TTL`) e limite LRU próprio
+    (`max_results`); jobs que esperam mais que o TTL na fila são descartados sem gerar.
+    """
+
+    def __init__(
+        self,
+        workers: int = CHAT_JOB_WORKERS,
+        max_pending: int = CHAT_JOB_MAX_PENDING,
+        ttl_seconds: float = CHAT_JOB_TTL,
+        max_results: int = CHAT_JOB_MAX_RESULTS,
+    ) -> None:
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.ttl_seconds = ttl_seconds
+        self.active: Dict[str, ChatJob] = {}
+        self.jobs = MemoryCache(max_entries=max(1, max_results), ttl_seconds=ttl_seconds)
+        self._queue: Optional["asyncio.Queue[ChatJob]"] = None
+        self._tasks: List[asyncio.Task] = []
+        self._running = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.abandoned = 0
+        self._total_queue_wait = 0.0
+
+    @property
+    def queue(self) -> "asyncio.Queue[ChatJob]":
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+        return self._queue
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"{self.workers} workers de jobs de chat iniciados")
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, job: ChatJob) -> ChatJob:
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise OverloadedError("fila de jobs de chat cheia", self.retry_after())
+        self.active[job.id] = job
+        self.submitted += 1
+        return job
+
+    def get(self, job_id: str) -> ChatJob:
+        job = self.active.get(job_id) or self.jobs.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job não encontrado ou expirado")
+        return job
+
+    def retry_after(self) -> int:
+        avg_seconds = 10.0
+        return max(1, int(avg_seconds * (self.queue.qsize() + 1) / self.workers))
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job = await self.queue.get()
+            try:
+                if time.time() - job.created_at > self.ttl_seconds:
+                    self.active.pop(job.id, None)
+                    self.abandoned += 1
+                    continue
+                await self._run(job)
+            except Exception as exc:
+                logger.error(f"Erro inesperado no worker de chat {index}: {exc}")
+            finally:
+                self.queue.task_done()
+
+    async def _run(self, job: ChatJob) -> None:
+        job.status = RUNNING
+        job.started_at = time.time()
+        self._total_queue_wait += job.started_at - job.created_at
+        self._running += 1
+        try:
+            job.result = await handle_chat(
+                job.message,
+                session_id=job.session_id,
+                user_id=job.user_id,
+                max_tokens=job.max_tokens,
+                temperature=job.temperature,
+                deadline=Deadline(CHAT_JOB_DEADLINE),
+            )
+            job.status = DONE
+            self.completed += 1
+        except HTTPException as exc:
+            job.status, job.error = FAILED, str(exc.detail)
+            self.failed += 1
+        except Exception as exc:
+            logger.error(f"Job de chat {job.id[:8]} falhou: {exc}")
+            job.status, job.error = FAILED, "Erro interno ao processar a mensagem"
+            self.failed += 1
+        finally:
+            self._running -= 1
+            job.finished_at = time.time()
+            self.jobs.set(job.id, job)
+            self.active.pop(job.id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        started = self.completed + self.failed + self._running
+        return {
+            "workers": self.workers,
+            "running": self._running,
+            "queued": self.queue.qsize(),
+            "max_pending": self.max_pending,
+            "active": len(self.active),
+            "stored_results": len(self.jobs),
+            "ttl_seconds": self.ttl_seconds,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "abandoned": self.abandoned,
+            "avg_queue_wait_seconds": round(self._total_queue_wait / started, 3) if started else 0.0,
+        }
+
+
+chat_jobs = ChatJobManager()
@@ -0,0 +1,220 @@
+"""
+Persistência write-behind das mensagens de sessão e do log de respostas: os registros
+entram num buffer sem bloquear o turno e são gravados em INSERTs de várias linhas.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from backend.db.database import AsyncSessionLocal
+from backend.models.chat_models import ResponseLog, SessionMessage
+
+logger = logging.getLogger(__name__)
+
+CHAT_LOG_BATCH_SIZE = int(os.getenv("CHAT_LOG_BATCH_SIZE", "200"))
+CHAT_LOG_FLUSH_MS = float(os.getenv("CHAT_LOG_FLUSH_MS", "200"))
+CHAT_LOG_MAX_BUFFER = int(os.getenv("CHAT_LOG_MAX_BUFFER", "5000"))
+CHAT_LOG_MAX_ATTEMPTS = 3
+
+TABLES = {"session_messages": SessionMessage, "response_log": ResponseLog}
+
+
+@dataclass
+class PendingRow:
+    table: str
+    values: Dict[str, Any]
+    session_id: Optional[str]
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class ChatLogWriter:
+    """
+    Buffer FIFO gravado por uma task própria quando junta `batch_size` registros ou
+    quando o mais antigo espera `flush_ms`. O `created_at` é atribuído ao enfileirar,
+    estritamente crescente, então a ordem de uma sessão é preservada mesmo que um
+    registro seja gravado antes de outro mais antigo. Com o buffer cheio, o registro
+    é gravado na hora (fallback síncrono) em vez de crescer a memória sem limite.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = CHAT_LOG_BATCH_SIZE,
+        flush_ms: float = CHAT_LOG_FLUSH_MS,
+        max_buffer: int = CHAT_LOG_MAX_BUFFER,
+    ) -> None:
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.0, flush_ms) / 1000.0
+        self.max_buffer = max(self.batch_size, max_buffer)
+        self._buffer: Deque[PendingRow] = deque()
+        self._pending_sessions: Counter = Counter()
+        self._last_created_at: Optional[datetime] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._attempts = 0
+
+        self.batches = 0
+        self.rows = 0
+        self.sync_writes = 0
+        self.errors = 0
+        self.dropped = 0
+        self.max_observed_batch = 0
+        self.last_flush_ms = 0.0
+        self.max_lag_seconds = 0.0
+
+    def _ensure_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._wake = asyncio.Event()
+            self._lock = asyncio.Lock()
+            self._worker = loop.create_task(self._run())
+
+    def _next_created_at(self) -> datetime:
+        now = datetime.now(timezone.utc)
+        if self._last_created_at is not None and now <= self._last_created_at:
+            now = self._last_created_at + timedelta(microseconds=1)
+        self._last_created_at = now
+        return now
+
+    async def add(self, table: str, values: Dict[str, Any]) -> None:
+        """Enfileira uma linha de `session_messages` ou `response_log`."""
+        self._ensure_worker()
+        row = PendingRow(table, {**values, "created_at": self._next_created_at()}, values.get("session_id"))
+        if len(self._buffer) >= self.max_buffer:
+            self.sync_writes += 1
+            await self._write_overflow(row)
+            return
+        self._buffer.append(row)
+        if row.session_id:
+            self._pending_sessions[row.session_id] += 1
+        if len(self._buffer) == 1 or len(self._buffer) >= self.batch_size:
+            self._wake.set()
+
+    def has_pending(self, session_id: str) -> bool:
+        return self._pending_sessions.get(session_id, 0) > 0
+
+    async def _write(self, rows: List[PendingRow]) -> None:
+        by_table: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            by_table.setdefault(row.table, []).append(row.values)
+        async with AsyncSessionLocal() as db:
+            for table, values in by_table.items():
+                await db.execute(insert(TABLES[table]).values(values))
+            await db.commit()
+
+    async def _write_overflow(self, row: PendingRow) -> None:
+        """
+        Grava na hora um registro que não coube no buffer, com as mesmas tentativas e
+        contagem de descartes dos lotes: uma falha do banco nunca derruba o turno.
+        """
+        for attempt in range(1, CHAT_LOG_MAX_ATTEMPTS + 1):
+            try:
+                await self._write([row])
+                return
+            except Exception as exc:
+                self.errors += 1
+                if attempt < CHAT_LOG_MAX_ATTEMPTS:
+                    logger.error(f"Erro ao gravar registro de chat fora do buffer (tentativa {attempt}): {exc}")
+                    await asyncio.sleep(self.flush_interval)
+                else:
+                    logger.error(f"Descartando registro de chat após {attempt} tentativas: {exc}")
+                    self.dropped += 1
+
+    async def _flush_batch(self) -> bool:
+        """Grava um lote do início do buffer; devolve False se a gravação falhou."""
+        batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+        if not batch:
+            return True
+        started = time.perf_counter()
+        try:
+            await self._write(batch)
+        except Exception as exc:
+            self.errors += 1
+            self._attempts += 1
+            if self._attempts < CHAT_LOG_MAX_ATTEMPTS:
+                logger.error(f"Erro ao gravar lote de {len(batch)} registros de chat (tentativa {self._attempts}): {exc}")
+                self._buffer.extendleft(reversed(batch))
+                return False
+            logger.error(f"Descartando lote de {len(batch)} registros de chat após {self._attempts} tentativas: {exc}")
+            self.dropped += len(batch)
+        else:
+            self.batches += 1
+            self.rows += len(batch)
+            self.max_observed_batch = max(self.max_observed_batch, len(batch))
+            self.last_flush_ms = (time.perf_counter() - started) * 1000.0
+            self.max_lag_seconds = max(self.max_lag_seconds, time.monotonic() - batch[0].enqueued_at)
+        self._attempts = 0
+        for row in batch:
+            if row.session_id:
+                self._pending_sessions[row.session_id] -= 1
+                if self._pending_sessions[row.session_id] <= 0:
+                    del self._pending_sessions[row.session_id]
+        return True
+
+    async def flush(self) -> None:
+        """Grava tudo o que está no buffer (ou desiste após falhas seguidas)."""
+        if self._lock is None:
+            return
+        async with self._lock:
+            while self._buffer:
+                if not await self._flush_batch():
+                    await asyncio.sleep(self.flush_interval)
+
+    async def _run(self) -> None:
+        while True:
+            await self._wake.wait()
+            self._wake.clear()
+            if self._buffer and len(self._buffer) < self.batch_size:
+                wait = self.flush_interval - (time.monotonic() - self._buffer[0].enqueued_at)
+                if wait > 0:
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), timeout=wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    self._wake.clear()
+            await self.flush()
+
+    async def close(self) -> None:
+        """Encerra a task gravando antes o que restou no buffer."""
+        if self._worker is None:
+            return
+        if self._buffer:
+            logger.info(f"Gravando {len(self._buffer)} registros de chat pendentes antes de encerrar")
+        await self.flush()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "buffered": len(self._buffer),
+            "max_buffer": self.max_buffer,
+            "batch_size": self.batch_size,
+            "flush_ms": self.flush_interval * 1000.0,
+            "lag_seconds": round(time.monotonic() - self._buffer[0].enqueued_at, 3) if self._buffer else 0.0,
+            "max_lag_seconds": round(self.max_lag_seconds, 3),
+            "batches": self.batches,
+            "rows": self.rows,
+            "avg_batch_size": round(self.rows / self.batches, 1) if self.batches else 0.0,
+            "max_observed_batch": self.max_observed_batch,
+            "last_flush_ms": round(self.last_flush_ms, 1),
+            "sync_writes": self.sync_writes,
+            "errors": self.errors,
+            "dropped": self.dropped,
+        }
+
+
+chat_log_writer = ChatLogWriter()
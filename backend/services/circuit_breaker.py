@@ -0,0 +1,150 @@
+"""
+Disjuntor (circuit breaker) das chamadas ao modelo: com taxa de erros e timeouts
+alta, para de chamar o Ollama por um tempo e deixa as respostas de contingência
+assumirem, em vez de acumular fila e retentativas contra um servidor doente.
+"""
+
+import os
+import time
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BREAKER_WINDOW_SECONDS = float(os.getenv("MODEL_BREAKER_WINDOW_SECONDS", "60"))
+BREAKER_MIN_CALLS = int(os.getenv("MODEL_BREAKER_MIN_CALLS", "5"))
+BREAKER_FAILURE_RATE = float(os.getenv("MODEL_BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_OPEN_SECONDS = float(os.getenv("MODEL_BREAKER_OPEN_SECONDS", "30"))
+BREAKER_HALF_OPEN_SUCCESSES = int(os.getenv("MODEL_BREAKER_HALF_OPEN_SUCCESSES", "2"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Chamada recusada sem tentar o modelo porque o disjuntor está aberto."""
+
+
+class CircuitBreaker:
+    """
+    Fechado: registra o resultado das chamadas numa janela deslizante e abre quando,
+    com ao menos `min_calls` chamadas, a fração de falhas atinge `failure_rate`.
+    Aberto: recusa tudo por `open_seconds`. Meio aberto: deixa passar uma sonda por
+    vez; `half_open_successes` sucessos seguidos fecham o disjuntor e uma falha o
+    reabre. Uma sonda que não reporta resultado em `open_seconds` é substituída.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window_seconds: float = BREAKER_WINDOW_SECONDS,
+        min_calls: int = BREAKER_MIN_CALLS,
+        failure_rate: float = BREAKER_FAILURE_RATE,
+        open_seconds: float = BREAKER_OPEN_SECONDS,
+        half_open_successes: int = BREAKER_HALF_OPEN_SUCCESSES,
+    ) -> None:
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = max(1, min_calls)
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.half_open_successes = max(1, half_open_successes)
+        self._state = CLOSED
+        self._calls: Deque[Tuple[float, bool]] = deque()
+        self._opened_at = 0.0
+        self._probe_started: Optional[float] = None
+        self._probe_successes = 0
+        self.times_opened = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probe_started = None
+            self._probe_successes = 0
+            logger.info(f"Disjuntor {self.name} meio aberto: testando o modelo")
+        return self._state
+
+    @property
+    def closed(self) -> bool:
+        return self.state == CLOSED
+
+    def _prune(self, now: float) -> None:
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+
+    def _open(self, reason: str) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probe_started = None
+        self._calls.clear()
+        self.times_opened += 1
+        logger.warning(f"Disjuntor {self.name} aberto por {self.open_seconds:.0f}s: {reason}")
+
+    def allow(self) -> bool:
+        """Se uma chamada pode ser feita agora; no estado meio aberto, reserva a sonda."""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN:
+            now = time.monotonic()
+            if self._probe_started is None or now - self._probe_started >= self.open_seconds:
+                self._probe_started = now
+                return True
+        self.rejected += 1
+        return False
+
+    def check(self) -> None:
+        if not self.allow():
+            raise CircuitOpenError(f"Disjuntor {self.name} aberto")
+
+    def record_success(self) -> None:
+        if self._state == HALF_OPEN:
+            self._probe_started = None
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_successes:
+                self._state = CLOSED
+                self._calls.clear()
+                logger.info(f"Disjuntor {self.name} fechado: modelo respondendo")
+            return
+        now = time.monotonic()
+        self._calls.append((now, True))
+        self._prune(now)
+
+    def record_failure(self, exc: BaseException) -> None:
+        self.last_error = str(exc) or exc.__class__.__name__
+        if self._state == HALF_OPEN:
+            self._open(f"sonda falhou ({self.last_error})")
+            return
+        if self._state == OPEN:
+            return
+        now = time.monotonic()
+        self._calls.append((now, False))
+        self._prune(now)
+        failures = sum(1 for _, ok in self._calls if not ok)
+        if len(self._calls) >= self.min_calls and failures / len(self._calls) >= self.failure_rate:
+            self._open(f"{failures} falhas em {len(self._calls)} chamadas ({self.last_error})")
+
+    def stats(self) -> Dict[str, Any]:
+        state = self.state
+        self._prune(time.monotonic())
+        failures = sum(1 for _, ok in self._calls if not ok)
+        return {
+            "state": state,
+            "window_calls": len(self._calls),
+            "window_failures": failures,
+            "window_failure_rate": round(failures / len(self._calls), 3) if self._calls else 0.0,
+            "open_remaining_seconds": (
+                round(max(0.0, self.open_seconds - (time.monotonic() - self._opened_at)), 1) if state == OPEN else 0.0
+            ),
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "last_error": self.last_error,
+        }
+
+
+model_breaker = CircuitBreaker("modelo")
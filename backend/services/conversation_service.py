@@ -6,18 +6,41 @@ import uuid
 import json
 import time
 import re
-from typing import Optional, List, Dict, Any
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Optional, List, Dict, Any, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.exc import ProgrammingError
+from backend.db.database import AsyncSessionLocal
+from backend.models.chat_models import SessionMessage
+from backend.services.admission import OverloadedError
+from backend.services.chat_log_writer import chat_log_writer
+from backend.services.circuit_breaker import CircuitOpenError
+from backend.services.deadline import Deadline, DeadlineExceeded, GenerationTimeout
+from backend.services.ollama_client import (
+    MODEL_NAME,
+    StreamCleaner,
+    _clean_and_validate_response,
+    generate_from_ollama,
+    stream_from_ollama,
+)
+from backend.services.prompt_builder import PromptBudget, estimate_tokens, fits_in_context
+from backend.services.retrieval import RetrievalPlan, retrieve
+from backend.services.session_context import session_contexts
+from backend.services.document_projection import document_text
 
-from sqlalchemy import or_, text
-from backend.db.database import SessionLocal
-from backend.models.chat_models import SessionMessage, ResponseLog
-from backend.models.models import DocumentoPolitico, Politico
-from backend.services.ollama_client import generate_from_ollama
-from backend.services.embedding_service import find_similar_politicians, find_similar_documents
+logger = logging.getLogger(__name__)
 
 IRIS_NAME = "Iris"
 MAX_HISTORY_MESSAGES = 50
 MAX_SNIPPET_CHARS = 600
+# tamanho da lista `recentes` de politico_votos_resumo (scripts/05_resumo_votos.sql)
+VOTE_SUMMARY_RECENT = 100
+STREAM_HEAD_CHARS = 80
+# abaixo disso não vale chamar o modelo: responde com o texto de contingência do turno
+MIN_GENERATION_SECONDS = 3.0
 
 SYSTEM_BIO = (
     f"Eu sou {IRIS_NAME}, uma assistente de análise política automatizada.\n\n"
@@ -27,6 +50,55 @@ SYSTEM_BIO = (
     "- Estou em desenvolvimento contínuo para melhor servir o interesse público."
 )
 
+# prefixo estável de toda sessão: enviado só no primeiro turno; os seguintes reaproveitam
+# o contexto devolvido pelo Ollama e mandam apenas o prompt do turno
+SESSION_INSTRUCTIONS = (
+    f"Você é {IRIS_NAME}, uma assistente de análise política sobre políticos e documentos "
+    "legislativos do Brasil. Responda sempre em português, de forma objetiva e imparcial, "
+    "usando apenas as informações fornecidas em cada pergunta e sem repetir estas instruções.\n\n"
+)
+
+POLITICO_PROMPT = """
+Responda de forma natural e informativa sobre este político brasileiro, baseado apenas nas informações fornecidas:
+
+INFORMAÇÕES:
+{context}
+
+VOTAÇÕES REGISTRADAS:
+{votos}
+
+PERGUNTA DO USUÁRIO: {question}
+
+Responda de forma objetiva e imparcial, mencionando os dados de votação quando relevantes. Se houver muitos votos, mencione os mais recentes ou os mais relevantes. Não adicione informações não fornecidas. {nota_votos}
+"""
+VOTES_COMPLETE_NOTE = "Você tem acesso a todos os votos do político, então não diga que não consegue citar todos."
+VOTES_SELECTION_NOTE = (
+    "A lista de votações é uma seleção das mais relevantes e recentes; "
+    "os totais nas informações consideram todas as votações."
+)
+
+DEFINITION_PROMPT = """
+Com base nos documentos abaixo, explique de forma clara e objetiva o conceito solicitado:
+
+DOCUMENTOS:
+{documentos}
+
+PERGUNTA: {question}
+
+Forneça uma explicação educativa baseada apenas nas informações dos documentos. Mantenha linguagem acessível.
+"""
+
+DOCUMENTS_PROMPT = """
+Com base nos documentos legislativos abaixo, responda à pergunta de forma informativa e objetiva:
+
+DOCUMENTOS:
+{documentos}
+
+PERGUNTA: {question}
+
+Responda baseando-se apenas nas informações dos documentos. Seja preciso e imparcial.
+"""
+
 
 def _snippet(text: Optional[str], chars: int = MAX_SNIPPET_CHARS) -> str:
     if not text:
@@ -35,54 +107,82 @@ def _snippet(text: Optional[str], chars: int = MAX_SNIPPET_CHARS) -> str:
     return (s[:chars] + "...") if len(s) > chars else s
 
 
-def get_session_history(session_id: str, limit: int = MAX_HISTORY_MESSAGES) -> List[Dict[str, Any]]:
-    db = SessionLocal()
-    try:
-        rows = (
-            db.query(SessionMessage)
-            .filter(SessionMessage.session_id == session_id)
+def _document_ids(documents: List[Dict[str, Any]]) -> List[str]:
+    return [str(d.get("id")) for d in documents]
+
+
+async def get_session_history(session_id: str, limit: int = MAX_HISTORY_MESSAGES) -> List[Dict[str, Any]]:
+    if chat_log_writer.has_pending(session_id):
+        await chat_log_writer.flush()
+    async with AsyncSessionLocal() as db:
+        stmt = (
+            select(SessionMessage)
+            .where(SessionMessage.session_id == session_id)
             .order_by(SessionMessage.created_at.asc())
             .limit(limit)
-            .all()
         )
+        rows = (await db.execute(stmt)).scalars().all()
         return [{"role": r.role, "message": r.message, "created_at": r.created_at.isoformat()} for r in rows]
-    finally:
-        db.close()
 
 
-def save_session_message(session_id: str, role: str, message: str) -> None:
-    db = SessionLocal()
-    try:
-        sm = SessionMessage(session_id=session_id, role=role, message=message)
-        db.add(sm)
-        db.commit()
-    finally:
-        db.close()
+async def save_session_message(session_id: str, role: str, message: str) -> None:
+    await chat_log_writer.add("session_messages", {"session_id": session_id, "role": role, "message": message})
 
 
-def log_response(prompt: str, response: str, session_id: Optional[str], user_id: Optional[str], sources: List[str]) -> None:
-    db = SessionLocal()
-    try:
-        rl = ResponseLog(session_id=session_id, user_id=user_id, prompt=prompt, response=response, sources=sources)
-        db.add(rl)
-        db.commit()
-    finally:
-        db.close()
+async def log_response(prompt: str, response: str, session_id: Optional[str], user_id: Optional[str], sources: List[str]) -> None:
+    await chat_log_writer.add("response_log", {
+        "session_id": session_id, "user_id": user_id, "prompt": prompt, "response": response, "sources": sources,
+    })
 
 
-def _normalize_query(q: str) -> str:
-    if not q:
-        return ""
-    q = q.strip()
-    m = re.search(r"(?i)^(quem é|quem foi|quem|sobre|fale sobre|diga[ -]?me quem é)\s+(.+)$", q)
-    candidate = m.group(2) if m else q
-    candidate = re.sub(r"[?¡!,.]+", "", candidate).strip()
-    return candidate
+_VOTE_SUMMARY_SQL = text(
+    """
+    SELECT total, sim, nao, abstencao, ausente, recentes
+    FROM politico_votos_resumo
+    WHERE politico_id = :pid
+    """
+)
+_vote_summary_unavailable = False
 
 
-def _fetch_politico_votes(politico_id: str) -> List[Dict[str, Any]]:
-    db = SessionLocal()
-    try:
+def _summarize_votes(votes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Mesmo formato de `politico_votos_resumo`, calculado a partir da lista completa."""
+    counts = {"SIM": 0, "NAO": 0, "ABSTENCAO": 0, "AUSENTE": 0}
+    for vote in votes:
+        value = (vote.get("voto") or "").upper().replace("Ã", "A").replace("Ç", "C")
+        if value in counts:
+            counts[value] += 1
+    return {
+        "total": len(votes),
+        "sim": counts["SIM"],
+        "nao": counts["NAO"],
+        "abstencao": counts["ABSTENCAO"],
+        "ausente": counts["AUSENTE"],
+        "recentes": votes[-VOTE_SUMMARY_RECENT:],
+    }
+
+
+async def _fetch_vote_summary(politico_id: str) -> Dict[str, Any]:
+    """
+    Totais e votações recentes do político numa leitura pela chave de `politico_votos_resumo`
+    (mantida por triggers). Sem a tabela, cai na junção completa de `_fetch_politico_votes`.
+    """
+    global _vote_summary_unavailable
+    if not _vote_summary_unavailable:
+        try:
+            async with AsyncSessionLocal() as db:
+                row = (await db.execute(_VOTE_SUMMARY_SQL, {"pid": politico_id})).mappings().first()
+            if row is None:
+                return _summarize_votes([])
+            return {**row, "recentes": list(row["recentes"] or [])}
+        except ProgrammingError as exc:
+            logger.warning(f"Resumo de votos indisponível ({exc.orig}); usando a consulta completa")
+            _vote_summary_unavailable = True
+    return _summarize_votes(await _fetch_politico_votes(politico_id))
+
+
+async def _fetch_politico_votes(politico_id: str) -> List[Dict[str, Any]]:
+    async with AsyncSessionLocal() as db:
         sql = text(
             """
             SELECT dp.id_documento_origem AS doc_id,
@@ -95,7 +195,7 @@ def _fetch_politico_votes(politico_id: str) -> List[Dict[str, Any]]:
             ORDER BY dp.created_at NULLS LAST, dp.id_documento_origem
             """
         )
-        rows = db.execute(sql, {"pid": politico_id}).mappings().all()
+        rows = (await db.execute(sql, {"pid": politico_id})).mappings().all()
         return [
             {
                 "document_id": r["doc_id"],
@@ -105,107 +205,68 @@ def _fetch_politico_votes(politico_id: str) -> List[Dict[str, Any]]:
             }
             for r in rows
         ]
-    finally:
-        db.close()
-
-
-def _fetch_politico_by_search(q: str, limit: int = 3) -> List[Dict[str, Any]]:
-    db = SessionLocal()
-    try:
-        terms = [term for term in re.split(r"\s+", _normalize_query(q)) if len(term) > 3]
-        stop_words = {'que', 'como', 'para', 'com', 'por', 'uma', 'mas', 'não', 'sim', 'uma', 'este', 'esta', 'isso'}
-        terms = [t for t in terms if t.lower() not in stop_words]
-        patterns = [f"%{term}%" for term in terms] if terms else []
-        if not patterns:
-            return []
-        
-        conditions = []
-        for p in patterns:
-            conditions.extend([
-                Politico.nome.ilike(p),
-                Politico.partido.ilike(p),
-                Politico.uf.ilike(p)
-            ])
-        
-        rows = (
-            db.query(Politico)
-            .filter(or_(*conditions))
-            .filter(Politico.ativo == True)
-            .order_by(Politico.nome.asc())
-            .limit(limit)
-            .all()
-        )
-        
-        return [
-            {
-                "id": str(r.id),
-                "id_camara": r.id_camara,
-                "nome": r.nome,
-                "partido": r.partido,
-                "uf": r.uf,
-                "cargo": r.cargo,
-                "ativo": r.ativo,
-                "biografia_resumo": r.biografia_resumo,
-                "similarity": 1.0
-            }
-            for r in rows
-        ]
-    finally:
-        db.close()
 
 
-def _fetch_documents_by_search(q: str, limit: int = 4) -> List[Dict[str, Any]]:
-    db = SessionLocal()
-    try:
-        terms = [term for term in re.split(r"\s+", _normalize_query(q)) if len(term) > 3]
-        stop_words = {'que', 'como', 'para', 'com', 'por', 'uma', 'mas', 'não', 'sim', 'uma', 'este', 'esta', 'isso'}
-        terms = [t for t in terms if t.lower() not in stop_words]
-        patterns = [f"%{term}%" for term in terms] if terms else [f"%{q}%"]
-        
-        conditions = []
-        for p in patterns:
-            conditions.extend([
-                DocumentoPolitico.titulo.ilike(p),
-                DocumentoPolitico.ementa.ilike(p),
-                DocumentoPolitico.resumo_simplificado.ilike(p),
-                DocumentoPolitico.conteudo_original.ilike(p)
-            ])
-        
-        rows = (
-            db.query(DocumentoPolitico)
-            .filter(or_(*conditions))
-            .order_by(DocumentoPolitico.created_at.desc())
-            .limit(limit)
-            .all()
-        )
-        
-        return [
-            {
-                "id": str(r.id),
-                "id_documento_origem": r.id_documento_origem,
-                "titulo": r.titulo,
-                "ementa": r.ementa,
-                "resumo_simplificado": r.resumo_simplificado,
-                "conteudo_original": r.conteudo_original,
-                "url_fonte": r.url_fonte,
-                "max_similarity": 1.0
-            }
-            for r in rows
-        ]
-    finally:
-        db.close()
-
-
-def _build_politician_summary(politico: Dict[str, Any], votes: List[Dict[str, Any]]) -> Dict[str, Any]:
+def _drop_session_context_if_full(session_id: str, max_tokens: int) -> int:
+    """
+    Descarta o contexto guardado da sessão se ele não deixa espaço para um prompt
+    mínimo mais `max_tokens` de resposta, para que o turno recomece do zero. Devolve
+    os tokens de contexto que continuam na janela (0 se não havia ou foi descartado).
+    A pergunta geral chama com `max_tokens * 2` porque o seu turno gera até o dobro
+    de tokens (ver `_prepare_turn`) e não passa por `PromptBudget`.
+    """
+    history = session_contexts.length(session_id, MODEL_NAME)
+    if history and not fits_in_context(history, max_tokens):
+        session_contexts.drop(session_id)
+        return 0
+    return history
+
+
+def _session_reserved_tokens(session_id: str, max_tokens: int) -> int:
+    """
+    Tokens que já ocupam a janela antes do prompt do turno: o contexto guardado da
+    sessão (se ainda couber) ou, no primeiro turno, as instruções fixas.
+    """
+    return _drop_session_context_if_full(session_id, max_tokens) or estimate_tokens(SESSION_INSTRUCTIONS)
+
+
+def _rank_votes(votes: List[Dict[str, Any]], question: str) -> List[Dict[str, Any]]:
+    """
+    Ordena as votações para caber no orçamento do prompt: primeiro as que compartilham
+    termos com a pergunta, depois as mais recentes (a consulta as traz em ordem cronológica).
+    """
+    terms = {t for t in re.findall(r"\w+", (question or "").lower()) if len(t) > 3}
+
+    def key(item: Tuple[int, Dict[str, Any]]) -> Tuple[int, int]:
+        index, vote = item
+        titulo = (vote.get("titulo") or "").lower()
+        return (-sum(1 for t in terms if t in titulo), -index)
+
+    return [vote for _, vote in sorted(enumerate(votes), key=key)]
+
+
+def _budget_documents(
+    budget: PromptBudget,
+    documents: List[Dict[str, Any]],
+    render: Callable[[Dict[str, Any], str], str],
+) -> List[str]:
+    """Divide o orçamento restante igualmente entre os documentos com conteúdo."""
+    with_content = [(doc, document_text(doc)) for doc in documents]
+    with_content = [(doc, content) for doc, content in with_content if content.strip()]
+    per_doc = budget.remaining // max(1, len(with_content))
+    return [budget.take_truncated("documentos", render(doc, content), per_doc) for doc, content in with_content]
+
+
+def _build_politician_summary(politico: Dict[str, Any], resumo: Dict[str, Any]) -> Dict[str, Any]:
     nome = politico.get("nome")
     partido = politico.get("partido", "Partido não informado")
     uf = politico.get("uf", "")
     cargo = politico.get("cargo", "representante público")
     biografia = politico.get("biografia_resumo", "")
     
-    sim_count = sum(1 for v in votes if (v.get("voto") or "").upper() == "SIM")
-    nao_count = sum(1 for v in votes if (v.get("voto") or "").upper() == "NAO")
-    total_votes = len(votes)
+    sim_count = resumo["sim"]
+    nao_count = resumo["nao"]
+    total_votes = resumo["total"]
     
     context_parts = [f"{nome} é {cargo}"]
     
@@ -221,6 +282,8 @@ def _build_politician_summary(politico: Dict[str, Any], votes: List[Dict[str, An
         context_parts.append(f" Possui {total_votes} votações registradas")
         if sim_count > 0 or nao_count > 0:
             context_parts.append(f", sendo {sim_count} favoráveis e {nao_count} contrárias")
+        if resumo["abstencao"] or resumo["ausente"]:
+            context_parts.append(f" ({resumo['abstencao']} abstenções e {resumo['ausente']} ausências)")
     
     base_text = "".join(context_parts) + "."
     
@@ -229,7 +292,9 @@ def _build_politician_summary(politico: Dict[str, Any], votes: List[Dict[str, An
         "sim_count": sim_count,
         "nao_count": nao_count,
         "total_votes": total_votes,
-        "examples": votes[:3],
+        "abstencao_count": resumo["abstencao"],
+        "ausente_count": resumo["ausente"],
+        "examples": resumo["recentes"][-3:],
         "biografia": biografia
     }
 
@@ -296,7 +361,7 @@ def _documents_are_relevant(documents: List[Dict[str, Any]], query: str) -> bool
     query_terms.discard('explique')
     
     for doc in documents[:3]:
-        content = (doc.get('conteudo_original') or doc.get('resumo_simplificado') or doc.get('ementa') or '').lower()
+        content = document_text(doc).lower()
         titulo = (doc.get('titulo') or '').lower()
         
         for term in query_terms:
@@ -306,95 +371,96 @@ def _documents_are_relevant(documents: List[Dict[str, Any]], query: str) -> bool
     return False
 
 
-async def handle_chat(
+@dataclass
+class ChatTurn:
+    """
+    Turno de chat já preparado: recuperação feita e prompt montado, pronto para ser
+    gerado de uma vez (`handle_chat`) ou em stream (`stream_chat`).
+    """
+    session_id: str
+    user_id: Optional[str]
+    user_message: str
+    log_payload: Dict[str, Any]
+    fallback_text: str
+    prompt: Optional[str] = None
+    empty_text: Optional[str] = None
+    max_tokens: int = 1024
+    temperature: float = 0.0
+    evidence: List[Dict[str, Any]] = field(default_factory=list)
+    sources: List[Dict[str, Any]] = field(default_factory=list)
+    deadline: Deadline = field(default_factory=Deadline)
+    started_at: float = field(default_factory=time.time)
+
+    @property
+    def text_on_empty(self) -> str:
+        return self.fallback_text if self.empty_text is None else self.empty_text
+
+
+async def _prepare_turn(
     user_message: str,
-    session_id: Optional[str] = None,
-    user_id: Optional[str] = None,
-    max_tokens: int = 1024,
-    temperature: float = 0.0,
-) -> Dict[str, Any]:
-    session_id = session_id or str(uuid.uuid4())
-    start = time.time()
-
-    save_session_message(session_id, "user", user_message)
+    session_id: str,
+    user_id: Optional[str],
+    max_tokens: int,
+    temperature: float,
+    deadline: Deadline,
+) -> ChatTurn:
+    await save_session_message(session_id, "user", user_message)
+
+    def turn(**kwargs: Any) -> ChatTurn:
+        kwargs.setdefault("max_tokens", max_tokens)
+        report = kwargs["log_payload"].get("prompt")
+        if report:
+            logger.info(
+                f"Prompt {kwargs['log_payload']['type']}: ~{report['estimated_tokens']} de "
+                f"{report['budget_tokens']} tokens (cortes: {', '.join(report['truncated']) or 'nenhum'})"
+            )
+        return ChatTurn(session_id=session_id, user_id=user_id, user_message=user_message,
+                        temperature=temperature, deadline=deadline, **kwargs)
 
     if _is_self_intro_query(user_message):
-        save_session_message(session_id, "assistant", SYSTEM_BIO)
-        log_response(json.dumps({"type": "self_intro"}, ensure_ascii=False), SYSTEM_BIO, session_id, user_id, [])
-        elapsed = time.time() - start
-        return {
-            "response": SYSTEM_BIO,
-            "evidence": [],
-            "sources": [],
-            "session_id": session_id,
-            "processing_time": elapsed,
-        }
+        return turn(log_payload={"type": "self_intro"}, fallback_text=SYSTEM_BIO)
 
     is_definition = _is_definition_query(user_message)
     
     use_embeddings = _should_use_embedding_search(user_message)
     
-    politicos = []
-    if not is_definition:
-        if use_embeddings:
-            try:
-                politicos = await find_similar_politicians(user_message, limit=2)
-            except Exception:
-                politicos = _fetch_politico_by_search(user_message, limit=2)
-        else:
-            politicos = _fetch_politico_by_search(user_message, limit=2)
-            if not politicos:
-                try:
-                    politicos = await find_similar_politicians(user_message, limit=2)
-                except Exception:
-                    politicos = []
-
-    if use_embeddings:
-        try:
-            documents = await find_similar_documents(user_message, limit=5)
-        except Exception:
-            documents = _fetch_documents_by_search(user_message, limit=5)
-    else:
-        documents = _fetch_documents_by_search(user_message, limit=4)
-        if not documents:
-            try:
-                documents = await find_similar_documents(user_message, limit=4)
-            except Exception:
-                documents = []
+    retrieval = await retrieve(RetrievalPlan(
+        query=user_message,
+        include_politicos=not is_definition,
+        prefer_embeddings=use_embeddings,
+    ), deadline)
+    politicos = retrieval.politicos
+    documents = retrieval.documents
 
     if politicos and len(politicos) > 0:
         politico = politicos[0]
-        votes = _fetch_politico_votes(politico["id"])
-        summary_data = _build_politician_summary(politico, votes)
-        
-         
-        votos_text = "\n".join(f"- {v.get('titulo')}: {v.get('voto')}" for v in votes)
-
-        context_prompt = f"""
-Responda de forma natural e informativa sobre este político brasileiro, baseado apenas nas informações fornecidas:
-
-INFORMAÇÕES:
-{summary_data["context"]}
-
-VOTAÇÕES REGISTRADAS:
-{votos_text}
-
-PERGUNTA DO USUÁRIO: {user_message}
-
-Responda de forma objetiva e imparcial, mencionando os dados de votação quando relevantes. Se houver muitos votos, mencione os mais recentes ou os mais relevantes. Não adicione informações não fornecidas. Você tem acesso a todos os votos do político, então não diga que não consegue citar todos.
-"""
-
         try:
-            model_response = await generate_from_ollama(
-                context_prompt,
-                session_id=session_id,
-                user_name=user_id or "anonymous",
-                max_tokens=max_tokens,
-                temperature=temperature,
-            )
-            model_text = _clean_model_response(str(model_response)) if model_response else summary_data['context']
-        except Exception:
-            model_text = summary_data['context']
+            resumo = await deadline.run(_fetch_vote_summary(politico["id"]), stage="votos")
+        except DeadlineExceeded:
+            logger.warning("Votações não carregadas dentro do prazo")
+            resumo = _summarize_votes([])
+        votes = resumo["recentes"]
+        summary_data = _build_politician_summary(politico, resumo)
+
+        budget = PromptBudget(max_tokens, reserved=_session_reserved_tokens(session_id, max_tokens))
+        budget.take("instrucoes", POLITICO_PROMPT.format(
+            context="", votos="", question=user_message, nota_votos=VOTES_SELECTION_NOTE
+        ))
+        context_text = budget.take_truncated("contexto", summary_data["context"], budget.remaining // 3)
+        vote_lines = budget.take_lines(
+            "votos", [f"- {v.get('titulo')}: {v.get('voto')}" for v in _rank_votes(votes, user_message)]
+        )
+        omitted = resumo["total"] - len(vote_lines)
+        if omitted > 0:
+            vote_lines.append(budget.take("votos", f"(+{omitted} votações não listadas)"))
+        votos_text = "\n".join(vote_lines)
+
+        context_prompt = POLITICO_PROMPT.format(
+            context=context_text,
+            votos=votos_text,
+            question=user_message,
+            nota_votos=VOTES_SELECTION_NOTE if omitted > 0 else VOTES_COMPLETE_NOTE,
+        )
 
         evidence = []
         for vote in summary_data['examples']:
@@ -408,125 +474,69 @@ Responda de forma objetiva e imparcial, mencionando os dados de votação quando
             {"id": f"politico-{politico.get('id_camara')}", "title": politico.get('nome'), "type": "deputado"}
         ]
 
-        save_session_message(session_id, "assistant", model_text)
-        log_response(
-            json.dumps({"type": "politico", "data": summary_data}, ensure_ascii=False), 
-            model_text, session_id, user_id, [s.get("id") for s in sources]
+        return turn(
+            prompt=context_prompt,
+            fallback_text=summary_data['context'],
+            log_payload={"type": "politico", "data": summary_data, "prompt": budget.report()},
+            evidence=evidence,
+            sources=sources,
         )
-        elapsed = time.time() - start
-        return {
-            "response": model_text,
-            "evidence": evidence,
-            "sources": sources,
-            "session_id": session_id,
-            "processing_time": elapsed,
-        }
 
     if is_definition and documents and _documents_are_relevant(documents, user_message):
-        relevant_content = []
-        for doc in documents[:3]:
-            content = doc.get('conteudo_original') or doc.get('resumo_simplificado') or doc.get('ementa') or ""
-            if content.strip():
-                relevant_content.append(f"**{doc.get('titulo')}**\n{_snippet(content, 400)}")
+        budget = PromptBudget(max_tokens, reserved=_session_reserved_tokens(session_id, max_tokens))
+        budget.take("instrucoes", DEFINITION_PROMPT.format(documentos="", question=user_message))
+        relevant_content = _budget_documents(
+            budget, documents[:3], lambda doc, content: f"**{doc.get('titulo')}**\n{_snippet(content, 400)}"
+        )
         
         content_text = "\n\n".join(relevant_content)
         
-        definition_prompt = f"""
-Com base nos documentos abaixo, explique de forma clara e objetiva o conceito solicitado:
-
-DOCUMENTOS:
-{content_text}
-
-PERGUNTA: {user_message}
-
-Forneça uma explicação educativa baseada apenas nas informações dos documentos. Mantenha linguagem acessível.
-"""
-
-        try:
-            model_response = await generate_from_ollama(
-                definition_prompt,
-                session_id=session_id,
-                user_name=user_id or "anonymous",
-                max_tokens=max_tokens,
-                temperature=temperature,
-            )
-            model_text = _clean_model_response(str(model_response)) if model_response else content_text[:500]
-        except Exception:
-            model_text = content_text[:500]
+        definition_prompt = DEFINITION_PROMPT.format(documentos=content_text, question=user_message)
 
         sources = [
             {"id": d.get("id_documento_origem"), "title": d.get("titulo"), "type": "documento"} 
             for d in documents[:3]
         ]
         
-        save_session_message(session_id, "assistant", model_text)
-        log_response(
-            json.dumps({"type": "definition_from_docs", "docs": documents[:3]}, ensure_ascii=False), 
-            model_text, session_id, user_id, [s.get("id") for s in sources]
+        return turn(
+            prompt=definition_prompt,
+            fallback_text=content_text[:500],
+            log_payload={
+                "type": "definition_from_docs", "docs": _document_ids(documents[:3]), "prompt": budget.report()
+            },
+            sources=sources,
         )
-        elapsed = time.time() - start
-        return {
-            "response": model_text,
-            "evidence": [],
-            "sources": sources,
-            "session_id": session_id,
-            "processing_time": elapsed,
-        }
 
     if documents and len(documents) > 0 and not is_definition:
         relevant_docs = [d for d in documents if d.get('max_similarity', 0) > 0.6][:4]
         
         if relevant_docs:
-            doc_summaries = []
-            for doc in relevant_docs:
-                content = doc.get('conteudo_original') or doc.get('resumo_simplificado') or doc.get('ementa') or ""
-                if content.strip():
-                    doc_summaries.append(f"**{doc.get('titulo')}**: {_snippet(content, 300)}")
+            budget = PromptBudget(max_tokens, reserved=_session_reserved_tokens(session_id, max_tokens))
+            budget.take("instrucoes", DOCUMENTS_PROMPT.format(documentos="", question=user_message))
+            doc_summaries = _budget_documents(
+                budget, relevant_docs, lambda doc, content: f"**{doc.get('titulo')}**: {_snippet(content, 300)}"
+            )
             
             combined_content = "\n\n".join(doc_summaries)
             
-            document_prompt = f"""
-Com base nos documentos legislativos abaixo, responda à pergunta de forma informativa e objetiva:
-
-DOCUMENTOS:
-{combined_content}
-
-PERGUNTA: {user_message}
-
-Responda baseando-se apenas nas informações dos documentos. Seja preciso e imparcial.
-"""
-
-            try:
-                model_response = await generate_from_ollama(
-                    document_prompt,
-                    session_id=session_id,
-                    user_name=user_id or "anonymous",
-                    max_tokens=max_tokens,
-                    temperature=temperature,
-                )
-                model_text = _clean_model_response(str(model_response)) if model_response else combined_content[:500]
-            except Exception:
-                model_text = combined_content[:500]
+            document_prompt = DOCUMENTS_PROMPT.format(documentos=combined_content, question=user_message)
 
             sources = [
                 {"id": d.get("id_documento_origem"), "title": d.get("titulo"), "type": "documento"} 
                 for d in relevant_docs
             ]
             
-            save_session_message(session_id, "assistant", model_text)
-            log_response(
-                json.dumps({"type": "docs_summary", "docs": relevant_docs}, ensure_ascii=False), 
-                model_text, session_id, user_id, [s.get("id") for s in sources]
+            return turn(
+                prompt=document_prompt,
+                fallback_text=combined_content[:500],
+                log_payload={
+                    "type": "docs_summary", "docs": _document_ids(relevant_docs), "prompt": budget.report()
+                },
+                sources=sources,
             )
-            elapsed = time.time() - start
-            return {
-                "response": model_text,
-                "evidence": [],
-                "sources": sources,
-                "session_id": session_id,
-                "processing_time": elapsed,
-            }
 
+    # sem fontes para cortar, a pergunta geral só precisa de espaço para a resposta em dobro
+    _drop_session_context_if_full(session_id, max_tokens * 2)
     general_prompt = f"""
 Responda de forma informativa e educativa à pergunta abaixo sobre política brasileira:
 
@@ -535,28 +545,174 @@ PERGUNTA: {user_message}
 Forneça uma resposta clara e objetiva baseada em conhecimento geral, mantendo neutralidade política. Evite adicionar opiniões sobre questões gerais de deputados da base, a menos que seja explicitamente solicitado na pergunta do usuário.
 """
 
+    return turn(
+        prompt=general_prompt,
+        fallback_text="Sistema temporariamente indisponível. Tente reformular sua pergunta.",
+        empty_text="Não consegui processar sua consulta adequadamente.",
+        log_payload={"type": "general_knowledge", "query": user_message},
+        max_tokens=max_tokens * 2,
+    )
+
+
+async def _generate_turn(turn: ChatTurn) -> str:
+    if turn.prompt is None:
+        return turn.fallback_text
+    if turn.deadline.remaining() < MIN_GENERATION_SECONDS:
+        logger.warning(f"Prazo insuficiente para gerar ({turn.deadline.remaining():.1f}s); usando resposta de contingência")
+        return turn.fallback_text
     try:
         model_response = await generate_from_ollama(
-            general_prompt,
-            session_id=session_id,
-            user_name=user_id or "anonymous",
-            max_tokens=max_tokens * 2,
-            temperature=temperature,
+            turn.prompt,
+            session_id=turn.session_id,
+            user_name=turn.user_id or "anonymous",
+            max_tokens=turn.max_tokens,
+            temperature=turn.temperature,
+            session_prefix=SESSION_INSTRUCTIONS,
+            deadline=turn.deadline,
         )
-        model_text = _clean_model_response(str(model_response)) if model_response else "Não consegui processar sua consulta adequadamente."
+        return _clean_model_response(str(model_response)) if model_response else turn.text_on_empty
+    except (OverloadedError, GenerationTimeout):
+        raise
+    except CircuitOpenError:
+        logger.info(f"Modelo indisponível (disjuntor aberto); usando resposta de contingência ({turn.log_payload['type']})")
+        return turn.fallback_text
     except Exception:
-        model_text = "Sistema temporariamente indisponível. Tente reformular sua pergunta."
+        return turn.fallback_text
 
-    save_session_message(session_id, "assistant", model_text)
-    log_response(
-        json.dumps({"type": "general_knowledge", "query": user_message}, ensure_ascii=False), 
-        model_text, session_id, user_id, []
+
+async def _finalize_turn(turn: ChatTurn, model_text: str) -> Dict[str, Any]:
+    await save_session_message(turn.session_id, "assistant", model_text)
+    await log_response(
+        json.dumps(turn.log_payload, ensure_ascii=False), 
+        model_text, turn.session_id, turn.user_id, [s.get("id") for s in turn.sources]
     )
-    elapsed = time.time() - start
+    elapsed = time.time() - turn.started_at
     return {
         "response": model_text,
-        "evidence": [],
-        "sources": [],
-        "session_id": session_id,
+        "evidence": turn.evidence,
+        "sources": turn.sources,
+        "session_id": turn.session_id,
         "processing_time": elapsed,
-    }
\ No newline at end of file
+    }
+
+
+async def handle_chat(
+    user_message: str,
+    session_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    max_tokens: int = 1024,
+    temperature: float = 0.0,
+    deadline: Optional[Deadline] = None,
+) -> Dict[str, Any]:
+    session_id = session_id or str(uuid.uuid4())
+    turn = await _prepare_turn(user_message, session_id, user_id, max_tokens, temperature, deadline or Deadline())
+    model_text = await _generate_turn(turn)
+    return await _finalize_turn(turn, model_text)
+
+
+async def stream_chat(
+    user_message: str,
+    session_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    max_tokens: int = 1024,
+    temperature: float = 0.0,
+    deadline: Optional[Deadline] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Versão em stream de `handle_chat`. Produz eventos `meta` (fontes e evidências),
+    `token` (fragmentos já limpos de vazamentos de prompt) e `done` com a resposta
+    final, que é persistida ao término do stream, mesmo se o cliente desconectar.
+    """
+    session_id = session_id or str(uuid.uuid4())
+    turn = await _prepare_turn(user_message, session_id, user_id, max_tokens, temperature, deadline or Deadline())
+
+    if turn.prompt is None or turn.deadline.remaining() < MIN_GENERATION_SECONDS:
+        yield {"event": "meta", "session_id": session_id, "sources": turn.sources, "evidence": turn.evidence}
+        yield {"event": "token", "text": turn.fallback_text}
+        yield {"event": "done", **(await _finalize_turn(turn, turn.fallback_text))}
+        return
+
+    cleaner = StreamCleaner()
+    raw_parts: List[str] = []
+    head_sent = False
+    pending = ""
+    finalized = False
+
+    def emit(text: str) -> Optional[str]:
+        # o início da resposta fica retido até a primeira linha para remover
+        # prefixos como "Aqui está a resposta:" antes de enviá-lo
+        nonlocal head_sent, pending
+        if head_sent:
+            return text or None
+        pending += text
+        if "\n" not in pending and len(pending) < STREAM_HEAD_CHARS:
+            return None
+        head_sent = True
+        head, pending = _clean_model_response(pending), ""
+        return head or None
+
+    tokens = stream_from_ollama(
+        turn.prompt,
+        session_id=session_id,
+        user_name=user_id or "anonymous",
+        max_tokens=turn.max_tokens,
+        temperature=turn.temperature,
+        session_prefix=SESSION_INSTRUCTIONS,
+        deadline=turn.deadline,
+    )
+    # o primeiro fragmento é aguardado antes do evento `meta` para que uma recusa
+    # por sobrecarga (503) ou um timeout imposto pelo prazo (504) chegue ao cliente
+    # como status HTTP, e não no meio de um stream 200
+    stream_failed = False
+    try:
+        raw_parts.append(await tokens.__anext__())
+    except (OverloadedError, GenerationTimeout):
+        await tokens.aclose()
+        raise
+    except StopAsyncIteration:
+        pass
+    except CircuitOpenError:
+        logger.info(f"Modelo indisponível (disjuntor aberto); usando resposta de contingência ({turn.log_payload['type']})")
+        stream_failed = True
+    except Exception as exc:
+        logger.warning(f"Stream do modelo falhou: {exc}")
+        stream_failed = True
+
+    yield {"event": "meta", "session_id": session_id, "sources": turn.sources, "evidence": turn.evidence}
+
+    try:
+        if raw_parts:
+            text_out = emit(cleaner.feed(raw_parts[0]))
+            if text_out:
+                yield {"event": "token", "text": text_out}
+        try:
+            if raw_parts and not stream_failed:
+                async for chunk in tokens:
+                    raw_parts.append(chunk)
+                    text_out = emit(cleaner.feed(chunk))
+                    if text_out:
+                        yield {"event": "token", "text": text_out}
+        except Exception as exc:
+            logger.warning(f"Stream do modelo interrompido: {exc}")
+        finally:
+            await tokens.aclose()
+
+        if raw_parts:
+            text_out = emit(cleaner.flush())
+            if not head_sent:
+                head_sent, text_out = True, _clean_model_response(pending)
+            if text_out:
+                yield {"event": "token", "text": text_out}
+            cleaned = _clean_and_validate_response("".join(raw_parts))
+            model_text = _clean_model_response(cleaned) if cleaned else turn.text_on_empty
+        else:
+            model_text = turn.fallback_text
+            yield {"event": "token", "text": model_text}
+
+        result = await _finalize_turn(turn, model_text)
+        finalized = True
+        yield {"event": "done", **result}
+    finally:
+        if not finalized:
+            partial = _clean_and_validate_response("".join(raw_parts)) if raw_parts else ""
+            asyncio.ensure_future(_finalize_turn(turn, _clean_model_response(partial) or turn.fallback_text))
@@ -0,0 +1,81 @@
+"""
+Versão dos dados de origem (tabela `versoes_dados`, mantida por triggers) usada para
+invalidar caches em todos os workers quando políticos, documentos ou votos mudam.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import text
+
+from backend.db.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+DATA_VERSION_TTL = float(os.getenv("DATA_VERSION_TTL", "5"))
+TRACKED_TABLES = ("politicos", "documentos_politicos", "votos_documento")
+
+_VERSIONS_SQL = text("SELECT tabela, versao, atualizado_em FROM versoes_dados")
+
+
+@dataclass(frozen=True)
+class DataVersion:
+    versions: Tuple[Tuple[str, int], ...]
+    updated_at: Dict[str, Optional[datetime]]
+
+    def token(self, *tables: str) -> str:
+        """Identificador compacto da versão das tabelas pedidas (todas por padrão)."""
+        wanted = tables or TRACKED_TABLES
+        return "-".join(str(v) for t, v in self.versions if t in wanted)
+
+    def last_modified(self, *tables: str) -> Optional[datetime]:
+        wanted = tables or TRACKED_TABLES
+        stamps = [self.updated_at.get(t) for t in wanted if self.updated_at.get(t)]
+        return max(stamps) if stamps else None
+
+
+class DataVersionTracker:
+    """
+    Lê `versoes_dados` no máximo uma vez a cada `ttl` segundos. Escritas feitas pelo
+    próprio processo chamam `invalidate()` para que a próxima leitura vá ao banco.
+    """
+
+    def __init__(self, ttl: float = DATA_VERSION_TTL) -> None:
+        self.ttl = ttl
+        self._current: Optional[DataVersion] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+        self._unavailable_logged = False
+
+    def invalidate(self) -> None:
+        self._checked_at = 0.0
+
+    async def current(self) -> Optional[DataVersion]:
+        if self._current is not None and time.monotonic() - self._checked_at < self.ttl:
+            return self._current
+        async with self._lock:
+            if self._current is not None and time.monotonic() - self._checked_at < self.ttl:
+                return self._current
+            try:
+                async with AsyncSessionLocal() as db:
+                    rows = (await db.execute(_VERSIONS_SQL)).mappings().all()
+            except Exception as exc:
+                if not self._unavailable_logged:
+                    logger.warning(f"Versão dos dados indisponível ({exc}); caches dependem só do TTL")
+                    self._unavailable_logged = True
+                return self._current
+            by_table = {r["tabela"]: r for r in rows}
+            self._current = DataVersion(
+                versions=tuple((t, int(by_table[t]["versao"]) if t in by_table else 0) for t in TRACKED_TABLES),
+                updated_at={t: by_table[t]["atualizado_em"] if t in by_table else None for t in TRACKED_TABLES},
+            )
+            self._checked_at = time.monotonic()
+            return self._current
+
+
+data_version = DataVersionTracker()
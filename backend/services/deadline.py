@@ -0,0 +1,73 @@
+"""
+Prazo de ponta a ponta de uma requisição de chat, repassado a cada etapa
+"""
+
+import os
+import time
+import asyncio
+from typing import Any, Awaitable, Optional
+
+from fastapi import HTTPException
+
+DEFAULT_CHAT_DEADLINE = float(os.getenv("CHAT_DEADLINE_SECONDS", "60"))
+MIN_CHAT_DEADLINE = 1.0
+MAX_CHAT_DEADLINE = float(os.getenv("CHAT_MAX_DEADLINE_SECONDS", "300"))
+DEADLINE_HEADER = "X-Request-Deadline"
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class GenerationTimeout(HTTPException):
+    """
+    O modelo não respondeu dentro do timeout encurtado pelo prazo do cliente; vira 504
+    só para essa requisição, sem contar como falha do servidor.
+    """
+
+    def __init__(self, timeout: float) -> None:
+        super().__init__(
+            status_code=504,
+            detail=f"O modelo não respondeu dentro do prazo da requisição ({timeout:.1f}s).",
+        )
+        self.timeout = timeout
+
+
+class Deadline:
+    """Instante limite absoluto (relógio monotônico) com o orçamento restante."""
+
+    def __init__(self, seconds: float = DEFAULT_CHAT_DEADLINE) -> None:
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    @classmethod
+    def from_header(cls, value: Optional[str]) -> "Deadline":
+        """Lê o prazo em segundos do cabeçalho `X-Request-Deadline`, limitado à faixa aceita."""
+        try:
+            seconds = float(value) if value else DEFAULT_CHAT_DEADLINE
+        except ValueError:
+            seconds = DEFAULT_CHAT_DEADLINE
+        return cls(min(MAX_CHAT_DEADLINE, max(MIN_CHAT_DEADLINE, seconds)))
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: Optional[float] = None, share: float = 1.0) -> float:
+        """Tempo disponível para uma etapa: uma fração do restante, opcionalmente com teto."""
+        available = self.remaining() * share
+        return available if cap is None else min(cap, available)
+
+    def check(self, needed: float = 0.0, stage: str = "") -> None:
+        if self.remaining() <= needed:
+            raise DeadlineExceeded(f"Prazo da requisição esgotado{f' ({stage})' if stage else ''}")
+
+    async def run(self, awaitable: Awaitable[Any], cap: Optional[float] = None, stage: str = "") -> Any:
+        """Aguarda `awaitable` dentro do prazo; levanta `DeadlineExceeded` se não couber."""
+        try:
+            return await asyncio.wait_for(awaitable, timeout=self.timeout(cap))
+        except asyncio.TimeoutError as exc:
+            raise DeadlineExceeded(f"Prazo da requisição esgotado{f' ({stage})' if stage else ''}") from exc
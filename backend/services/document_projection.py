@@ -0,0 +1,51 @@
+"""
+Projeções de colunas para documentos recuperados na busca
+"""
+
+import os
+from typing import Any, Dict, List
+
+from sqlalchemy import func
+
+from backend.models.models import DocumentoPolitico
+
+PROJECTIONS = ("snippet", "full")
+DEFAULT_PROJECTION = os.getenv("DOCUMENT_PROJECTION", "snippet")
+SNIPPET_DB_CHARS = int(os.getenv("DOCUMENT_SNIPPET_CHARS", "600"))
+
+
+def snippet_column(chars: int = SNIPPET_DB_CHARS) -> Any:
+    """Trecho do primeiro texto não vazio entre conteúdo, resumo e ementa, cortado no banco."""
+    source = func.coalesce(
+        func.nullif(DocumentoPolitico.conteudo_original, ""),
+        func.nullif(DocumentoPolitico.resumo_simplificado, ""),
+        func.nullif(DocumentoPolitico.ementa, ""),
+        "",
+    )
+    return func.left(source, chars).label("snippet")
+
+
+def document_columns(projection: str = DEFAULT_PROJECTION) -> List[Any]:
+    """
+    Colunas selecionadas para candidatos de busca. "snippet" traz apenas ids, título,
+    fonte e um trecho; "full" mantém o formato antigo com o texto completo.
+    """
+    base = [
+        DocumentoPolitico.id,
+        DocumentoPolitico.id_documento_origem,
+        DocumentoPolitico.titulo,
+        DocumentoPolitico.url_fonte,
+    ]
+    if projection == "full":
+        return base + [
+            DocumentoPolitico.ementa,
+            DocumentoPolitico.resumo_simplificado,
+            DocumentoPolitico.conteudo_original,
+        ]
+    return base + [snippet_column()]
+
+
+def document_text(doc: Dict[str, Any]) -> str:
+    """Texto utilizável de um documento em qualquer projeção."""
+    return doc.get("snippet") or doc.get("conteudo_original") or doc.get("resumo_simplificado") or doc.get("ementa") or ""
+
@@ -0,0 +1,237 @@
+"""
+Pipeline de backfill de embeddings com paginação por chave e checkpoint persistido
+"""
+
+import os
+import json
+import time
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select, update
+
+from backend.db.database import SessionLocal
+from backend.models.models import DocumentoPolitico, Politico
+from backend.services.embedding_service import embedding_service
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_PATH = Path(
+    os.getenv(
+        "EMBEDDING_BACKFILL_CHECKPOINT",
+        str(Path(__file__).parent / ".embedding_backfill_checkpoint.json"),
+    )
+)
+DEFAULT_BATCH_SIZE = int(os.getenv("EMBEDDING_BACKFILL_BATCH_SIZE", "64"))
+DEFAULT_COMMIT_EVERY = int(os.getenv("EMBEDDING_BACKFILL_COMMIT_EVERY", "4"))
+
+
+@dataclass
+class BackfillProgress:
+    """Acompanha o andamento de um backfill e calcula a vazão em linhas/s."""
+    label: str
+    rows_scanned: int = 0
+    rows_updated: int = 0
+    embeddings: int = 0
+    batches: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_scanned / self.elapsed if self.elapsed > 0 else 0.0
+
+    def report(self) -> None:
+        logger.info(
+            f"[{self.label}] {self.rows_scanned} linhas lidas, {self.rows_updated} atualizadas, "
+            f"{self.embeddings} embeddings em {self.elapsed:.1f}s ({self.rows_per_second:.1f} linhas/s)"
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "rows_scanned": self.rows_scanned,
+            "rows_updated": self.rows_updated,
+            "embeddings": self.embeddings,
+            "batches": self.batches,
+            "elapsed_seconds": round(self.elapsed, 2),
+            "rows_per_second": round(self.rows_per_second, 2),
+        }
+
+
+def load_checkpoint() -> Dict[str, str]:
+    try:
+        return json.loads(CHECKPOINT_PATH.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as exc:
+        logger.warning(f"Checkpoint de backfill ilegível ({exc}), iniciando do começo")
+        return {}
+
+
+def save_checkpoint(key: str, last_id: Optional[str]) -> None:
+    data = load_checkpoint()
+    if last_id is None:
+        data.pop(key, None)
+    else:
+        data[key] = last_id
+    tmp_path = CHECKPOINT_PATH.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(data), encoding="utf-8")
+    tmp_path.replace(CHECKPOINT_PATH)
+
+
+def reset_checkpoint() -> None:
+    try:
+        CHECKPOINT_PATH.unlink()
+    except FileNotFoundError:
+        pass
+
+
+async def update_politician_embeddings(
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    commit_every: int = DEFAULT_COMMIT_EVERY,
+    force: bool = False,
+) -> Dict[str, Any]:
+    """Preenche `embedding_biografia` de todos os políticos com biografia."""
+    progress = BackfillProgress("politicos")
+    last_id = load_checkpoint().get("politicos")
+    if last_id:
+        logger.info(f"Retomando backfill de políticos a partir de {last_id}")
+
+    db = SessionLocal()
+    pending_batches = 0
+    try:
+        while True:
+            stmt = select(Politico.id, Politico.biografia_resumo).where(
+                Politico.biografia_resumo.is_not(None),
+            )
+            if not force:
+                stmt = stmt.where(Politico.embedding_biografia.is_(None))
+            if last_id:
+                stmt = stmt.where(Politico.id > last_id)
+            rows = db.execute(stmt.order_by(Politico.id).limit(batch_size)).all()
+            if not rows:
+                break
+
+            embeddings = await embedding_service.generate_embeddings([r.biografia_resumo for r in rows])
+            updates = [
+                {"id": r.id, "embedding_biografia": emb}
+                for r, emb in zip(rows, embeddings)
+                if any(emb)
+            ]
+            if updates:
+                db.execute(update(Politico), updates)
+
+            last_id = str(rows[-1].id)
+            progress.rows_scanned += len(rows)
+            progress.rows_updated += len(updates)
+            progress.embeddings += len(updates)
+            progress.batches += 1
+            pending_batches += 1
+
+            if pending_batches >= commit_every:
+                db.commit()
+                save_checkpoint("politicos", last_id)
+                pending_batches = 0
+                progress.report()
+
+        db.commit()
+        save_checkpoint("politicos", None)
+        progress.report()
+        return progress.as_dict()
+
+    except Exception as exc:
+        logger.error(f"Erro no backfill de políticos (checkpoint em {last_id}): {exc}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _document_targets(row: Any, force: bool) -> List[Tuple[str, str]]:
+    targets = []
+    if row.titulo and (force or row.sem_titulo):
+        targets.append(("embedding_titulo", row.titulo))
+    if row.ementa and (force or row.sem_ementa):
+        targets.append(("embedding_ementa", row.ementa))
+    content = row.conteudo_original or row.resumo_simplificado
+    if content and (force or row.sem_documento):
+        targets.append(("embedding_documento", content))
+    return targets
+
+
+async def update_document_embeddings(
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    commit_every: int = DEFAULT_COMMIT_EVERY,
+    force: bool = False,
+) -> Dict[str, Any]:
+    """Preenche os embeddings de título, ementa e conteúdo de todos os documentos."""
+    progress = BackfillProgress("documentos")
+    last_id = load_checkpoint().get("documentos")
+    if last_id:
+        logger.info(f"Retomando backfill de documentos a partir de {last_id}")
+
+    db = SessionLocal()
+    pending_batches = 0
+    try:
+        while True:
+            stmt = select(
+                DocumentoPolitico.id,
+                DocumentoPolitico.titulo,
+                DocumentoPolitico.ementa,
+                DocumentoPolitico.conteudo_original,
+                DocumentoPolitico.resumo_simplificado,
+                DocumentoPolitico.embedding_titulo.is_(None).label("sem_titulo"),
+                DocumentoPolitico.embedding_ementa.is_(None).label("sem_ementa"),
+                DocumentoPolitico.embedding_documento.is_(None).label("sem_documento"),
+            )
+            if not force:
+                stmt = stmt.where(
+                    DocumentoPolitico.embedding_titulo.is_(None)
+                    | DocumentoPolitico.embedding_ementa.is_(None)
+                    | DocumentoPolitico.embedding_documento.is_(None)
+                )
+            if last_id:
+                stmt = stmt.where(DocumentoPolitico.id > last_id)
+            rows = db.execute(stmt.order_by(DocumentoPolitico.id).limit(batch_size)).all()
+            if not rows:
+                break
+
+            targets = [(row.id, column, text) for row in rows for column, text in _document_targets(row, force)]
+            embeddings = await embedding_service.generate_embeddings([text for _, _, text in targets])
+
+            per_row: Dict[Any, Dict[str, Any]] = {}
+            for (doc_id, column, _), emb in zip(targets, embeddings):
+                if any(emb):
+                    per_row.setdefault(doc_id, {"id": doc_id})[column] = emb
+            if per_row:
+                db.execute(update(DocumentoPolitico), list(per_row.values()))
+
+            last_id = str(rows[-1].id)
+            progress.rows_scanned += len(rows)
+            progress.rows_updated += len(per_row)
+            progress.embeddings += sum(len(u) - 1 for u in per_row.values())
+            progress.batches += 1
+            pending_batches += 1
+
+            if pending_batches >= commit_every:
+                db.commit()
+                save_checkpoint("documentos", last_id)
+                pending_batches = 0
+                progress.report()
+
+        db.commit()
+        save_checkpoint("documentos", None)
+        progress.report()
+        return progress.as_dict()
+
+    except Exception as exc:
+        logger.error(f"Erro no backfill de documentos (checkpoint em {last_id}): {exc}")
+        db.rollback()
+        raise
+    finally:
+        db.close()
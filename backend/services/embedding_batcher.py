@@ -0,0 +1,146 @@
+"""
+Micro-batching de embeddings: agrupa requisições concorrentes em um único encode
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "32"))
+BATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "10"))
+
+
+class EmbeddingBatcher:
+    """
+    Fila assíncrona que junta textos enviados por chamadas concorrentes e executa
+    um único `encode` por lote no executor, resolvendo o future de cada chamador
+    com o seu próprio vetor.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], Any],
+        max_batch_size: int = BATCH_MAX_SIZE,
+        max_wait_ms: float = BATCH_MAX_WAIT_MS,
+    ) -> None:
+        self._encode_fn = encode_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight: List[Tuple[str, asyncio.Future]] = []
+
+        self.batches = 0
+        self.items = 0
+        self.max_observed_batch = 0
+        self.last_batch_size = 0
+        self.total_encode_seconds = 0.0
+        self.errors = 0
+
+    def _ensure_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, text: str) -> np.ndarray:
+        """Enfileira um texto já limpo e aguarda o vetor correspondente."""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[str, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            pending = [(text, fut) for text, fut in batch if not fut.cancelled()]
+            if not pending:
+                continue
+            self._inflight = pending
+
+            texts = [text for text, _ in pending]
+            started = time.perf_counter()
+            try:
+                vectors = await self._loop.run_in_executor(None, self._encode_fn, texts)
+            except Exception as exc:
+                self.errors += 1
+                logger.error(f"Erro no encode em lote ({len(texts)} textos): {exc}")
+                for _, fut in pending:
+                    if not fut.done():
+                        fut.set_exception(exc)
+                self._inflight = []
+                continue
+
+            elapsed = time.perf_counter() - started
+            self.batches += 1
+            self.items += len(texts)
+            self.last_batch_size = len(texts)
+            self.max_observed_batch = max(self.max_observed_batch, len(texts))
+            self.total_encode_seconds += elapsed
+            logger.debug(f"Lote de embeddings: {len(texts)} textos em {elapsed * 1000:.1f}ms")
+
+            for i, (_, fut) in enumerate(pending):
+                if not fut.done():
+                    fut.set_result(vectors[i])
+            self._inflight = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": (self.items / self.batches) if self.batches else 0.0,
+            "max_observed_batch": self.max_observed_batch,
+            "last_batch_size": self.last_batch_size,
+            "encode_seconds_total": round(self.total_encode_seconds, 3),
+            "embeddings_per_second": (self.items / self.total_encode_seconds) if self.total_encode_seconds else 0.0,
+            "errors": self.errors,
+        }
+
+    async def close(self) -> None:
+        """Encerra a task e falha os pedidos ainda pendentes, para que nenhum chamador fique preso."""
+        if self._worker is not None and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+
+        pending = self._inflight
+        self._inflight = []
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        if pending:
+            logger.info(f"Descartando {len(pending)} pedidos de embedding pendentes no encerramento")
+        for _, fut in pending:
+            if not fut.done():
+                fut.set_exception(RuntimeError("Batcher de embeddings encerrado"))
@@ -2,6 +2,7 @@
 Serviço de embeddings
 """
 
+import os
 import hashlib
 import logging
 import asyncio
@@ -9,10 +10,15 @@ from typing import Any, Dict, List, Optional
 
 import numpy as np
 from sentence_transformers import SentenceTransformer
-from sqlalchemy import bindparam, func, select
+from sqlalchemy import bindparam, func, literal_column, select, union_all
 from sqlalchemy.exc import IntegrityError
 
-from backend.db.database import SessionLocal
+from backend.db.database import AsyncSessionLocal, SessionLocal
+from backend.db.vector_indexes import apply_search_params_async
+from backend.services.embedding_batcher import EmbeddingBatcher
+from backend.services.memory_cache import MemoryCache
+from backend.services.single_flight import SingleFlight
+from backend.services.document_projection import DEFAULT_PROJECTION, document_columns
 from backend.models.models import ( 
     DocumentoPolitico,
     Politico,
@@ -27,6 +33,8 @@ logger = logging.getLogger(__name__)
 MODEL_NAME = "neuralmind/bert-base-portuguese-cased"
 EMBEDDING_DIM = 768
 SIMILARITY_THRESHOLD = 0.7
+QUERY_CACHE_MAX_MB = float(os.getenv("QUERY_EMBEDDING_CACHE_MB", "32"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_EMBEDDING_CACHE_TTL", "86400"))
 
 
 def _normalize_embedding_for_db(embedding: Any) -> List[float]:
@@ -79,6 +87,14 @@ class EmbeddingService:
     def __init__(self) -> None:
         self.model: Optional[SentenceTransformer] = None
         self._lock = asyncio.Lock()
+        self.batcher = EmbeddingBatcher(self._encode_batch)
+        max_bytes = int(QUERY_CACHE_MAX_MB * 1024 * 1024)
+        self.memory_cache = MemoryCache(
+            max_entries=max(1, max_bytes // (EMBEDDING_DIM * 4)),
+            ttl_seconds=QUERY_CACHE_TTL,
+            max_bytes=max_bytes,
+        )
+        self.query_flight = SingleFlight("query_embedding")
 
     async def _ensure_model_loaded(self) -> None:
         if self.model is None:
@@ -89,6 +105,9 @@ class EmbeddingService:
                         None, lambda: SentenceTransformer(MODEL_NAME, device="cpu")
                     )
 
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(texts, batch_size=len(texts), convert_to_numpy=True)
+
     async def generate_embedding(self, text: str) -> List[float]:
         if not text or not text.strip():
             return [0.0] * EMBEDDING_DIM
@@ -97,15 +116,7 @@ class EmbeddingService:
         clean_text = text.strip().replace("\n", " ")[:512]
         
         try:
-            loop = asyncio.get_event_loop()
-            raw_embedding = await loop.run_in_executor(
-                None, lambda: self.model.encode([clean_text], convert_to_numpy=True)
-            )
-            
-            if isinstance(raw_embedding, np.ndarray) and raw_embedding.ndim == 2:
-                embedding_vector = raw_embedding[0]
-            else:
-                embedding_vector = raw_embedding
+            embedding_vector = await self.batcher.submit(clean_text)
             
             logger.debug(f"Embedding gerado - shape: {getattr(embedding_vector, 'shape', 'N/A')}, tipo: {type(embedding_vector)}")
             
@@ -115,15 +126,47 @@ class EmbeddingService:
             logger.error(f"Erro ao gerar embedding: {exc}")
             return [0.0] * EMBEDDING_DIM
 
+    async def generate_embeddings(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
+        """Gera embeddings para vários textos em um único encode, fora do micro-batching."""
+        results: List[List[float]] = [[0.0] * EMBEDDING_DIM for _ in texts]
+        indexed = [
+            (i, t.strip().replace("\n", " ")[:512])
+            for i, t in enumerate(texts)
+            if t and t.strip()
+        ]
+        if not indexed:
+            return results
+        
+        await self._ensure_model_loaded()
+        clean_texts = [t for _, t in indexed]
+        
+        loop = asyncio.get_event_loop()
+        raw = await loop.run_in_executor(
+            None,
+            lambda: self.model.encode(clean_texts, batch_size=batch_size, convert_to_numpy=True),
+        )
+        
+        for (i, _), vector in zip(indexed, raw):
+            results[i] = _normalize_embedding_for_db(vector)
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model_loaded": self.model is not None,
+            "batcher": self.batcher.stats(),
+            "query_cache": self.memory_cache.stats(),
+            "query_single_flight": self.query_flight.stats(),
+        }
+
     def _get_text_hash(self, text: str) -> str:
         return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
     async def get_cached_embedding(self, text: str) -> Optional[List[float]]:
         text_hash = self._get_text_hash(text)
-        db = SessionLocal()
+        db = AsyncSessionLocal()
         try:
             stmt = select(QueryEmbeddingCache).where(QueryEmbeddingCache.query_hash == text_hash)
-            row = db.execute(stmt).scalar_one_or_none()
+            row = (await db.execute(stmt)).scalar_one_or_none()
             if row is None:
                 return None
             
@@ -137,15 +180,15 @@ class EmbeddingService:
                 return normalized
             except Exception as conv_e:
                 logger.warning(f"Erro convertendo embedding do cache: {conv_e}. Removendo entrada inválida.")
-                db.delete(row)
-                db.commit()
+                await db.delete(row)
+                await db.commit()
                 return None
                 
         except Exception as exc:
             logger.warning(f"Erro ao buscar embedding em cache: {exc}")
             return None
         finally:
-            db.close()
+            await db.close()
 
     async def cache_embedding(self, query_text: str, embedding: List[float]) -> None:
         normalized_embedding = _normalize_embedding_for_db(embedding)
@@ -154,10 +197,10 @@ class EmbeddingService:
             return
         
         text_hash = self._get_text_hash(query_text)
-        db = SessionLocal()
+        db = AsyncSessionLocal()
         try:
-            exists_stmt = select(QueryEmbeddingCache).where(QueryEmbeddingCache.query_hash == text_hash)
-            exists = db.execute(exists_stmt).scalar_one_or_none()
+            exists_stmt = select(QueryEmbeddingCache.id).where(QueryEmbeddingCache.query_hash == text_hash)
+            exists = (await db.execute(exists_stmt)).scalar_one_or_none()
             if exists:
                 return
                 
@@ -168,27 +211,46 @@ class EmbeddingService:
             )
             db.add(record)
             try:
-                db.commit()
+                await db.commit()
                 logger.debug(f"Embedding cacheado com sucesso para query: {query_text[:50]}...")
             except IntegrityError:
-                db.rollback()
+                await db.rollback()
                 logger.debug("Embedding já existe no cache (conflito de integridade)")
         except Exception as exc:
             logger.warning(f"Erro ao salvar embedding em cache: {exc}")
         finally:
-            db.close()
+            await db.close()
+
+    def _remember(self, text_hash: str, embedding: List[float]) -> None:
+        arr = np.asarray(embedding, dtype=np.float32)
+        arr.setflags(write=False)
+        self.memory_cache.set(text_hash, arr)
 
     async def get_query_embedding(self, query: str) -> List[float]:
         if not query or not query.strip():
             return [0.0] * EMBEDDING_DIM
         
+        text_hash = self._get_text_hash(query)
+        hot = self.memory_cache.get(text_hash)
+        if hot is not None:
+            logger.debug("Usando embedding do cache em memória")
+            return hot.tolist()
+        
+        # consultas idênticas simultâneas compartilham a mesma busca no banco/modelo
+        embedding = await self.query_flight.do(text_hash, lambda: self._load_query_embedding(query, text_hash))
+        return list(embedding)
+
+    async def _load_query_embedding(self, query: str, text_hash: str) -> List[float]:
         cached = await self.get_cached_embedding(query)
         if cached:
             logger.debug("Usando embedding do cache")
+            self._remember(text_hash, cached)
             return cached
         
         logger.debug("Gerando novo embedding")
         embedding = await self.generate_embedding(query)
+        if any(embedding):
+            self._remember(text_hash, embedding)
         
         asyncio.create_task(self.cache_embedding(query, embedding))
         
@@ -198,9 +260,14 @@ class EmbeddingService:
 embedding_service = EmbeddingService()
 
 
-async def find_similar_politicians(query: str, limit: int = 3) -> List[Dict[str, Any]]:
+async def find_similar_politicians(
+    query: str,
+    limit: int = 3,
+    query_embedding: Optional[List[float]] = None,
+) -> List[Dict[str, Any]]:
     try:
-        query_embedding = await embedding_service.get_query_embedding(query)
+        if query_embedding is None:
+            query_embedding = await embedding_service.get_query_embedding(query)
         
         if not isinstance(query_embedding, list):
             logger.error(f"Query embedding não é lista: {type(query_embedding)}")
@@ -216,12 +283,13 @@ async def find_similar_politicians(query: str, limit: int = 3) -> List[Dict[str,
         
         logger.debug(f"Buscando políticos similares com embedding válido (tamanho: {len(query_embedding)})")
         
-        db = SessionLocal()
+        db = AsyncSessionLocal()
         try:
-            # Garantir que query_embedding seja uma lista plana de floats
-            query_embedding = _normalize_embedding_for_db(query_embedding)
+            await apply_search_params_async(db)
             qparam = bindparam("q_emb", type_=VectorType(EMBEDDING_DIM))
-            sim_expr = (1 - Politico.embedding_biografia.op("<=>")(qparam)).label("similarity")
+            # ordenar pela distância crua permite que o índice HNSW/IVFFlat de cosseno atenda a busca
+            distance = Politico.embedding_biografia.op("<=>")(qparam)
+            sim_expr = (1 - distance).label("similarity")
             stmt = (
                 select(
                     Politico.id,
@@ -239,24 +307,117 @@ async def find_similar_politicians(query: str, limit: int = 3) -> List[Dict[str,
                     Politico.ativo.is_(True),
                     sim_expr > SIMILARITY_THRESHOLD,
                 )
-                .order_by(sim_expr.desc())
+                .order_by(distance)
                 .limit(limit)
             )
-            result = db.execute(stmt, {"q_emb": query_embedding}).mappings().all()
+            result = (await db.execute(stmt, {"q_emb": query_embedding})).mappings().all()
             logger.debug(f"Encontrados {len(result)} políticos similares")
             return [dict(row) for row in result]
             
         finally:
-            db.close()
+            await db.close()
             
     except Exception as exc:
         logger.exception(f"Erro na busca de políticos por embedding: {exc}")
         return []
 
 
-async def find_similar_documents(query: str, limit: int = 5) -> List[Dict[str, Any]]:
+DOCUMENT_EMBEDDING_FIELDS = ("embedding_titulo", "embedding_ementa", "embedding_documento")
+DOCUMENT_SEARCH_MODES = ("greatest", "max", "rrf")
+DOCUMENT_SEARCH_MODE = os.getenv("DOCUMENT_SEARCH_MODE", "max")
+DOCUMENT_CANDIDATES_PER_FIELD = int(os.getenv("DOCUMENT_CANDIDATES_PER_FIELD", "20"))
+RRF_K = 60
+DOCUMENT_SIMILARITY_THRESHOLD = SIMILARITY_THRESHOLD - 0.1
+
+def _greatest_documents_stmt(qparam: Any, limit: int, projection: str) -> Any:
+    """Consulta original: maior similaridade entre os três campos, sem uso de índice."""
+    sim_title = func.coalesce(1 - DocumentoPolitico.embedding_titulo.op("<=>")(qparam), 0)
+    sim_ementa = func.coalesce(1 - DocumentoPolitico.embedding_ementa.op("<=>")(qparam), 0)
+    sim_doc = func.coalesce(1 - DocumentoPolitico.embedding_documento.op("<=>")(qparam), 0)
+    max_similarity = func.greatest(sim_title, sim_ementa, sim_doc).label("max_similarity")
+    
+    return (
+        select(*document_columns(projection), max_similarity)
+        .where(
+            (DocumentoPolitico.embedding_titulo.is_not(None)
+             | DocumentoPolitico.embedding_ementa.is_not(None)
+             | DocumentoPolitico.embedding_documento.is_not(None)),
+            max_similarity > DOCUMENT_SIMILARITY_THRESHOLD,
+        )
+        .order_by(max_similarity.desc())
+        .limit(limit)
+    )
+
+
+def _field_candidates_stmt(qparam: Any, candidates: int, projection: str) -> Any:
+    """Top-k de cada coluna de embedding pelo seu próprio índice, unidos em uma só ida ao banco."""
+    branches = []
+    for field_name in DOCUMENT_EMBEDDING_FIELDS:
+        column = getattr(DocumentoPolitico, field_name)
+        distance = column.op("<=>")(qparam)
+        branches.append(
+            select(
+                *document_columns(projection),
+                literal_column(f"'{field_name}'").label("field"),
+                (1 - distance).label("similarity"),
+            )
+            .where(column.is_not(None))
+            .order_by(distance)
+            .limit(candidates)
+        )
+    return union_all(*branches)
+
+
+def _fuse_document_candidates(rows: List[Dict[str, Any]], limit: int, mode: str) -> List[Dict[str, Any]]:
+    """Funde os candidatos por documento com max-score ou reciprocal rank fusion."""
+    ranked = sorted(rows, key=lambda r: (r["field"], -float(r["similarity"] or 0.0)))
+    ranks: Dict[str, int] = {}
+    fused: Dict[Any, Dict[str, Any]] = {}
+    for row in ranked:
+        field_name = row["field"]
+        ranks[field_name] = ranks.get(field_name, 0) + 1
+        similarity = float(row["similarity"] or 0.0)
+        
+        doc = fused.get(row["id"])
+        if doc is None:
+            doc = {k: v for k, v in row.items() if k not in ("field", "similarity")}
+            doc["max_similarity"] = similarity
+            doc["rrf_score"] = 0.0
+            doc["matched_fields"] = []
+            fused[row["id"]] = doc
+        
+        doc["max_similarity"] = max(doc["max_similarity"], similarity)
+        doc["rrf_score"] += 1.0 / (RRF_K + ranks[field_name])
+        doc["matched_fields"].append(field_name)
+    
+    docs = [d for d in fused.values() if d["max_similarity"] > DOCUMENT_SIMILARITY_THRESHOLD]
+    sort_key = "rrf_score" if mode == "rrf" else "max_similarity"
+    docs.sort(key=lambda d: d[sort_key], reverse=True)
+    return docs[:limit]
+
+
+async def find_similar_documents(
+    query: str,
+    limit: int = 5,
+    mode: Optional[str] = None,
+    projection: str = DEFAULT_PROJECTION,
+    query_embedding: Optional[List[float]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Busca documentos por similaridade semântica.
+    
+    `mode` seleciona a estratégia: "greatest" (maior similaridade calculada linha a linha,
+    varredura completa), "max" ou "rrf" (top-k por campo via índice ANN e fusão em Python).
+    `projection` controla as colunas retornadas (ver `document_projection`).
+    """
+    mode = mode or DOCUMENT_SEARCH_MODE
+    if mode not in DOCUMENT_SEARCH_MODES:
+        logger.warning(f"Modo de busca de documentos inválido: {mode}, usando 'max'")
+        mode = "max"
+    
     try:
-        query_embedding = await embedding_service.get_query_embedding(query)
+        if query_embedding is None:
+            query_embedding = await embedding_service.get_query_embedding(query)
         
         if not isinstance(query_embedding, list):
             logger.error(f"Query embedding não é lista: {type(query_embedding)}")
@@ -270,46 +431,28 @@ async def find_similar_documents(query: str, limit: int = 5) -> List[Dict[str, A
             logger.error("Query embedding contém valores inválidos")
             return []
         
-        logger.debug(f"Buscando documentos similares com embedding válido (tamanho: {len(query_embedding)}, tipo: {type(query_embedding)})")
+        logger.debug(f"Buscando documentos similares com embedding válido (tamanho: {len(query_embedding)}, modo: {mode})")
         
-        db = SessionLocal()
+        db = AsyncSessionLocal()
         try:
-            # Garantir que query_embedding seja uma lista plana de floats
-            query_embedding = _normalize_embedding_for_db(query_embedding)
-            logger.debug(f"Embedding após normalização: tamanho={len(query_embedding)}, primeiros valores={query_embedding[:5]}")
             qparam = bindparam("q_emb", type_=VectorType(EMBEDDING_DIM))
-            sim_title = func.coalesce(1 - DocumentoPolitico.embedding_titulo.op("<=>")(qparam), 0)
-            sim_ementa = func.coalesce(1 - DocumentoPolitico.embedding_ementa.op("<=>")(qparam), 0)
-            sim_doc = func.coalesce(1 - DocumentoPolitico.embedding_documento.op("<=>")(qparam), 0)
-            max_similarity = func.greatest(sim_title, sim_ementa, sim_doc).label("max_similarity")
             
-            stmt = (
-                select(
-                    DocumentoPolitico.id,
-                    DocumentoPolitico.id_documento_origem,
-                    DocumentoPolitico.titulo,
-                    DocumentoPolitico.ementa,
-                    DocumentoPolitico.resumo_simplificado,
-                    DocumentoPolitico.conteudo_original,
-                    DocumentoPolitico.url_fonte,
-                    max_similarity,
-                )
-                .where(
-                    (DocumentoPolitico.embedding_titulo.is_not(None)
-                     | DocumentoPolitico.embedding_ementa.is_not(None)
-                     | DocumentoPolitico.embedding_documento.is_not(None)),
-                    max_similarity > (SIMILARITY_THRESHOLD - 0.1),
-                )
-                .order_by(max_similarity.desc())
-                .limit(limit)
-            )
+            if mode == "greatest":
+                stmt = _greatest_documents_stmt(qparam, limit, projection)
+                result = (await db.execute(stmt, {"q_emb": query_embedding})).mappings().all()
+                documents = [dict(row) for row in result]
+            else:
+                await apply_search_params_async(db)
+                candidates = max(DOCUMENT_CANDIDATES_PER_FIELD, limit * 2)
+                stmt = _field_candidates_stmt(qparam, candidates, projection)
+                result = (await db.execute(stmt, {"q_emb": query_embedding})).mappings().all()
+                documents = _fuse_document_candidates([dict(row) for row in result], limit, mode)
             
-            result = db.execute(stmt, {"q_emb": query_embedding}).mappings().all()
-            logger.debug(f"Encontrados {len(result)} documentos similares")
-            return [dict(row) for row in result]
+            logger.debug(f"Encontrados {len(documents)} documentos similares")
+            return documents
             
         finally:
-            db.close()
+            await db.close()
             
     except Exception as exc:
         logger.exception(f"Erro na busca de documentos por embedding: {exc}")
@@ -361,80 +504,3 @@ async def validate_and_fix_stored_embeddings() -> None:
         db.rollback()
     finally:
         db.close()
-
-
-async def update_politician_embeddings() -> None:
-    db = SessionLocal()
-    try:
-        stmt = select(Politico).where(
-            Politico.biografia_resumo.is_not(None), 
-        ).limit(10)
-        rows = db.execute(stmt).scalars().all()
-        
-        for pol in rows:
-            if pol.biografia_resumo:
-                try:
-                    embedding = await embedding_service.generate_embedding(pol.biografia_resumo)
-                    normalized = _normalize_embedding_for_db(embedding)
-                    
-                    if len(normalized) == EMBEDDING_DIM:
-                        pol.embedding_biografia = normalized
-                        logger.debug(f"Embedding atualizado para político: {pol.nome}")
-                    else:
-                        logger.error(f"Embedding inválido para político {pol.nome}: tamanho {len(normalized)}")
-                        
-                except Exception as e:
-                    logger.error(f"Erro ao processar embedding para político {pol.nome}: {e}")
-                    
-        db.commit()
-        logger.info(f"Processados {len(rows)} políticos para atualização de embeddings")
-        
-    except Exception as exc:
-        logger.error(f"Erro ao atualizar embeddings de políticos: {exc}")
-        db.rollback()
-    finally:
-        db.close()
-
-
-async def update_document_embeddings() -> None:
-    db = SessionLocal()
-    try:
-        stmt = select(DocumentoPolitico).where(
-            DocumentoPolitico.titulo.is_not(None),
-        ).limit(10)
-        rows = db.execute(stmt).scalars().all()
-        
-        for doc in rows:
-            try:
-                if doc.titulo and doc.embedding_titulo is None:
-                    embedding = await embedding_service.generate_embedding(doc.titulo)
-                    normalized = _normalize_embedding_for_db(embedding)
-                    if len(normalized) == EMBEDDING_DIM:
-                        doc.embedding_titulo = normalized
-                
-                if doc.ementa and doc.embedding_ementa is None:
-                    embedding = await embedding_service.generate_embedding(doc.ementa)
-                    normalized = _normalize_embedding_for_db(embedding)
-                    if len(normalized) == EMBEDDING_DIM:
-                        doc.embedding_ementa = normalized
-                
-                content = doc.conteudo_original or doc.resumo_simplificado
-                if content and doc.embedding_documento is None:
-                    embedding = await embedding_service.generate_embedding(content)
-                    normalized = _normalize_embedding_for_db(embedding)
-                    if len(normalized) == EMBEDDING_DIM:
-                        doc.embedding_documento = normalized
-                        
-                logger.debug(f"Embeddings atualizados para documento: {doc.titulo[:50]}...")
-                
-            except Exception as e:
-                logger.error(f"Erro ao processar embeddings para documento {doc.titulo}: {e}")
-                
-        db.commit()
-        logger.info(f"Processados {len(rows)} documentos para atualização de embeddings")
-        
-    except Exception as exc:
-        logger.error(f"Erro ao atualizar embeddings de documentos: {exc}")
-        db.rollback()
-    finally:
-        db.close()
\ No newline at end of file
@@ -0,0 +1,61 @@
+"""
+Servidor Ollama falso para testar localmente o pool de servidores sem um modelo real.
+
+Uso:
+    FAKE_OLLAMA_DELAY=0.5 uvicorn backend.services.fake_ollama_server:app --port 11435
+    MODEL_SERVER_URLS=http://localhost:11435,http://localhost:11436 uvicorn backend.main:app
+
+FAKE_OLLAMA_FAIL_RATE (0 a 1) faz uma fração das gerações responder 500.
+"""
+
+import os
+import json
+import random
+import asyncio
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+DELAY = float(os.getenv("FAKE_OLLAMA_DELAY", "0.5"))
+FAIL_RATE = float(os.getenv("FAKE_OLLAMA_FAIL_RATE", "0"))
+ANSWER = (
+    "O deputado votou a favor do projeto na câmara, conforme os registros de votação "
+    "disponíveis, e o partido acompanhou a orientação da maioria."
+)
+
+app = FastAPI(title="Ollama falso")
+
+
+@app.get("/api/version")
+async def version():
+    return {"version": "fake"}
+
+
+@app.post("/api/generate")
+async def generate(request: Request):
+    payload = await request.json()
+    if FAIL_RATE and random.random() < FAIL_RATE:
+        return JSONResponse({"error": "falha simulada"}, status_code=500)
+
+    words = ANSWER.split(" ")
+    # imita o prefill: só os tokens novos (depois do `context` recebido) são processados
+    prompt_tokens = len(payload.get("prompt", "")) // 4
+    context = list(payload.get("context") or []) + list(range(prompt_tokens + len(words)))
+    final = {
+        "done": True,
+        "context": context,
+        "prompt_eval_count": prompt_tokens,
+        "prompt_eval_duration": prompt_tokens * 2_000_000,
+        "eval_count": len(words),
+    }
+    if not payload.get("stream", True):
+        await asyncio.sleep(DELAY)
+        return {"model": payload.get("model"), "response": ANSWER, **final}
+
+    async def chunks():
+        for word in words:
+            await asyncio.sleep(DELAY / len(words))
+            yield json.dumps({"response": word + " ", "done": False}) + "\n"
+        yield json.dumps({"response": "", **final}) + "\n"
+
+    return StreamingResponse(chunks(), media_type="application/x-ndjson")
@@ -0,0 +1,156 @@
+"""
+Cache HTTP das rotas de leitura: corpos JSON já serializados, com ETag e Last-Modified,
+e respostas 304 para requisições condicionais
+"""
+
+import os
+import hashlib
+import inspect
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+from backend.services.data_version import data_version
+from backend.services.memory_cache import MemoryCache
+
+logger = logging.getLogger(__name__)
+
+HTTP_CACHE_MAX_ENTRIES = int(os.getenv("HTTP_CACHE_MAX_ENTRIES", "256"))
+HTTP_CACHE_MB = int(os.getenv("HTTP_CACHE_MB", "32"))
+HTTP_CACHE_TTL = float(os.getenv("HTTP_CACHE_TTL", "3600"))
+# o navegador guarda a resposta mas revalida sempre: barato com 304
+CACHE_CONTROL = "no-cache"
+
+
+@dataclass
+class CachedBody:
+    body: bytes
+    etag: str
+    last_modified: datetime
+    version: Optional[str]
+    generation: int
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # comparação fraca (RFC 9110): W/"x" equivale a "x"
+    candidates = [c.strip().removeprefix("W/") for c in header.split(",")]
+    return etag in candidates
+
+
+def _not_modified_since(header: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+class ResponseCache:
+    """
+    Corpos de resposta indexados pela rota (e parâmetros). Uma entrada vale enquanto a
+    versão das tabelas de origem (`data_version`) e a geração da sua tag não mudarem;
+    as rotas de escrita chamam `invalidate(tag)` para que o próprio worker não sirva
+    dados antigos nem pelo intervalo de consulta da versão. O ETag é o hash do corpo,
+    então continua correto mesmo sem a tabela de versões.
+    """
+
+    def __init__(self) -> None:
+        self.cache = MemoryCache(
+            max_entries=HTTP_CACHE_MAX_ENTRIES,
+            ttl_seconds=HTTP_CACHE_TTL,
+            max_bytes=HTTP_CACHE_MB * 1024 * 1024,
+            sizeof=lambda entry: len(entry.body),
+        )
+        self._generations: Dict[str, int] = {}
+        self.not_modified = 0
+        self.builds = 0
+
+    def invalidate(self, tag: str) -> None:
+        self._generations[tag] = self._generations.get(tag, 0) + 1
+
+    async def _entry(
+        self,
+        key: str,
+        tag: str,
+        tables: Sequence[str],
+        build: Callable[[], Any],
+        headers: Optional[Callable[[Any], Dict[str, str]]],
+    ) -> CachedBody:
+        version = await data_version.current() if tables else None
+        token = version.token(*tables) if version else None
+        generation = self._generations.get(tag, 0)
+
+        entry = self.cache.get(key)
+        if entry is not None and entry.version == token and entry.generation == generation:
+            return entry
+
+        data = build()
+        if inspect.isawaitable(data):
+            data = await data
+        body = JSONResponse(content=jsonable_encoder(data)).body
+        last_modified = (version.last_modified(*tables) if version else None) or datetime.now(timezone.utc)
+        entry = CachedBody(
+            body=body,
+            etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"',
+            last_modified=last_modified,
+            version=token,
+            generation=generation,
+            headers=headers(data) if headers else {},
+        )
+        self.cache.set(key, entry)
+        self.builds += 1
+        return entry
+
+    async def respond(
+        self,
+        request: Request,
+        key: str,
+        build: Callable[[], Any],
+        tag: str,
+        tables: Sequence[str] = (),
+        headers: Optional[Callable[[Any], Dict[str, str]]] = None,
+    ) -> Response:
+        """
+        Resposta JSON de `build()` (síncrono ou assíncrono) servida do cache, com 304 quando
+        `If-None-Match` (ou, sem ele, `If-Modified-Since`) indica que o cliente já a tem.
+        `headers` deriva cabeçalhos extras dos dados, guardados junto com o corpo.
+        """
+        entry = await self._entry(key, tag, tables, build, headers)
+        response_headers = {
+            "ETag": entry.etag,
+            "Last-Modified": format_datetime(entry.last_modified.astimezone(timezone.utc), usegmt=True),
+            "Cache-Control": CACHE_CONTROL,
+            **entry.headers,
+        }
+
+        if_none_match = request.headers.get("if-none-match")
+        if_modified_since = request.headers.get("if-modified-since")
+        if (if_none_match and _etag_matches(if_none_match, entry.etag)) or (
+            not if_none_match and if_modified_since and _not_modified_since(if_modified_since, entry.last_modified)
+        ):
+            self.not_modified += 1
+            return Response(status_code=304, headers=response_headers)
+
+        return Response(content=entry.body, media_type="application/json", headers=response_headers)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "builds": self.builds,
+            "not_modified": self.not_modified,
+            "generations": dict(self._generations),
+            **self.cache.stats(),
+        }
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,113 @@
+"""
+Busca por palavras-chave com full-text search (tsvector) e trigramas do Postgres
+"""
+
+import re
+from typing import Any, Dict, List
+
+from sqlalchemy import func, literal_column, or_, select
+
+from backend.db.database import AsyncSessionLocal
+from backend.models.models import DocumentoPolitico, Politico
+from backend.services.document_projection import DEFAULT_PROJECTION, document_columns
+
+SIMPLE_CONFIG = literal_column("'simple'::regconfig")
+PORTUGUESE_CONFIG = literal_column("'portuguese'::regconfig")
+STOP_WORDS = {'que', 'como', 'para', 'com', 'por', 'uma', 'mas', 'não', 'sim', 'uma', 'este', 'esta', 'isso'}
+
+
+def _normalize_query(q: str) -> str:
+    if not q:
+        return ""
+    q = q.strip()
+    m = re.search(r"(?i)^(quem é|quem foi|quem|sobre|fale sobre|diga[ -]?me quem é)\s+(.+)$", q)
+    candidate = m.group(2) if m else q
+    candidate = re.sub(r"[?¡!,.]+", "", candidate).strip()
+    return candidate
+
+
+def _extract_terms(q: str) -> List[str]:
+    terms = [term for term in re.split(r"\s+", _normalize_query(q)) if len(term) > 3]
+    terms = [t for t in terms if t.lower() not in STOP_WORDS]
+    # apenas caracteres de palavra chegam à sintaxe do to_tsquery
+    terms = [re.sub(r"[^\w]", "", t) for t in terms]
+    return [t for t in terms if t]
+
+
+def _prefix_tsquery(terms: List[str]) -> str:
+    """Equivalente indexável do antigo OR de `ILIKE '%termo%'`: termos por prefixo unidos por OR."""
+    return " | ".join(f"{t}:*" for t in terms)
+
+
+async def search_politicos(q: str, limit: int = 3) -> List[Dict[str, Any]]:
+    """Políticos ativos por nome, partido ou UF, via índice GIN do tsvector ou trigramas do nome."""
+    terms = _extract_terms(q)
+    if not terms:
+        return []
+
+    normalized = _normalize_query(q)
+    tsquery = func.to_tsquery(SIMPLE_CONFIG, func.unaccent(_prefix_tsquery(terms)))
+    rank = func.ts_rank(Politico.busca_tsv, tsquery) + func.similarity(Politico.nome, normalized)
+
+    stmt = (
+        select(
+            Politico.id,
+            Politico.id_camara,
+            Politico.nome,
+            Politico.partido,
+            Politico.uf,
+            Politico.cargo,
+            Politico.ativo,
+            Politico.biografia_resumo,
+        )
+        .where(
+            or_(
+                Politico.busca_tsv.op("@@")(tsquery),
+                Politico.nome.op("%")(normalized),
+            ),
+            Politico.ativo.is_(True),
+        )
+        .order_by(rank.desc(), Politico.nome.asc())
+        .limit(limit)
+    )
+
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(stmt)).mappings().all()
+        return [
+            {
+                "id": str(r["id"]),
+                "id_camara": r["id_camara"],
+                "nome": r["nome"],
+                "partido": r["partido"],
+                "uf": r["uf"],
+                "cargo": r["cargo"],
+                "ativo": r["ativo"],
+                "biografia_resumo": r["biografia_resumo"],
+                "similarity": 1.0
+            }
+            for r in rows
+        ]
+
+
+async def search_documentos(q: str, limit: int = 4, projection: str = DEFAULT_PROJECTION) -> List[Dict[str, Any]]:
+    """Documentos ranqueados por `ts_rank` sobre título, ementa, resumo e conteúdo."""
+    terms = _extract_terms(q)
+    if terms:
+        tsquery = func.to_tsquery(PORTUGUESE_CONFIG, func.unaccent(_prefix_tsquery(terms)))
+    else:
+        tsquery = func.plainto_tsquery(PORTUGUESE_CONFIG, func.unaccent(q or ""))
+    rank = func.ts_rank(DocumentoPolitico.busca_tsv, tsquery)
+
+    stmt = (
+        select(*document_columns(projection))
+        .where(DocumentoPolitico.busca_tsv.op("@@")(tsquery))
+        .order_by(rank.desc(), DocumentoPolitico.created_at.desc())
+        .limit(limit)
+    )
+
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(stmt)).mappings().all()
+        return [
+            {**r, "id": str(r["id"]), "max_similarity": 1.0}
+            for r in rows
+        ]
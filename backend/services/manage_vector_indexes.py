@@ -0,0 +1,69 @@
+"""
+Script para gerenciar os índices vetoriais (HNSW/IVFFlat com cosseno)
+Uso: python -m backend.services.manage_vector_indexes {create,rebuild,verify,report}
+"""
+
+import argparse
+import logging
+import sys
+
+from backend.db.database import engine
+from backend.db.vector_indexes import (
+    INDEX_METHOD,
+    VECTOR_INDEXES,
+    create_index,
+    get_spec,
+    rebuild_index,
+    verify_indexes,
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Gerencia os índices vetoriais do pgvector")
+    parser.add_argument("command", choices=["create", "rebuild", "verify", "report"])
+    parser.add_argument("--method", choices=["hnsw", "ivfflat"], default=INDEX_METHOD)
+    parser.add_argument("--index", action="append", help="Restringe a um índice (pode repetir)")
+    return parser.parse_args(argv)
+
+
+def _format_size(size: int) -> str:
+    return f"{size / (1024 * 1024):.1f}MB"
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    specs = [get_spec(name) for name in args.index] if args.index else VECTOR_INDEXES
+
+    if args.command in ("create", "rebuild"):
+        action = create_index if args.command == "create" else rebuild_index
+        for spec in specs:
+            elapsed = action(engine, spec, args.method)
+            print(f"{spec.name:<36} {args.method:<8} build={elapsed:.2f}s")
+        return 0
+
+    results = verify_indexes(engine, specs)
+    failures = 0
+    for info in results:
+        if not info["exists"]:
+            print(f"{info['name']:<36} AUSENTE")
+            failures += 1
+            continue
+        status = "OK" if info["ok"] and info["used_by_planner"] else "FALHA"
+        failures += status != "OK"
+        line = f"{info['name']:<36} {status:<6} {info['method']:<8} cosine={info['cosine']} planner={info['used_by_planner']}"
+        if args.command == "report":
+            line += f" scans={info['idx_scan']} tuples={info['idx_tup_read']} size={_format_size(info['size_bytes'])}"
+        print(line)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
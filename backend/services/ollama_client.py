@@ -2,28 +2,42 @@ import os
 import httpx
 import logging
 import asyncio
-from typing import Optional, Dict, Any
+from typing import AsyncIterator, Optional, Dict, Any
+
+from backend.services.admission import PRIORITY_INTERACTIVE, admission_controller
+from backend.services.answer_cache import answer_cache
+from backend.services.circuit_breaker import CircuitOpenError, model_breaker
+from backend.services.deadline import MAX_CHAT_DEADLINE, Deadline, DeadlineExceeded, GenerationTimeout
+from backend.services.ollama_pool import ollama_pool
+from backend.services.session_context import session_contexts
+from backend.services.single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
-MODEL_SERVER = os.getenv("MODEL_SERVER_URL", "http://ollama:11434")
 MODEL_NAME = os.getenv("MODEL_NAME", "llama3.2:3b")
 DEFAULT_TIMEOUT = 180.0
 MAX_RETRIES = 3
 RETRY_DELAY = 2.0
+MIN_ATTEMPT_SECONDS = 2.0
+# regenerações por resposta de baixa qualidade (além da primeira tentativa)
+MAX_QUALITY_RETRIES = int(os.getenv("OLLAMA_MAX_QUALITY_RETRIES", "1"))
+NUM_CTX = int(os.getenv("OLLAMA_NUM_CTX", "2500"))
 
-async def generate_from_ollama(prompt: str, session_id: str, user_name: str = "anonymous",
-                               max_tokens: int = 600, temperature: float = 0.15) -> str:
-    """
-    Cliente Ollama otimizado para prompts estruturados e respostas detalhadas
-    """
-    
-    url = f"{MODEL_SERVER}/api/generate"
-    
-    payload = {
+PROMPT_LEAKS = [
+    'SISTEMA:', 'FONTES:', 'INSTRUÇÃO:', 'RESPOSTA:', 'PERGUNTA:',
+    'USER:', 'USUÁRIO:', 'ASSISTANT:', 'AI:', 'BOT:',
+    'TIPO:', 'TÍTULO:', 'DADOS:', 'CONTEXTO:', 'REGRAS:'
+]
+
+
+generation_flight = SingleFlight("generation")
+
+
+def _build_payload(prompt: str, max_tokens: int, temperature: float, stream: bool = False) -> Dict[str, Any]:
+    return {
         "model": MODEL_NAME,
         "prompt": prompt,
-        "stream": False,
+        "stream": stream,
         "options": {
             "num_predict": max_tokens,
             "temperature": temperature,
@@ -35,73 +49,179 @@ async def generate_from_ollama(prompt: str, session_id: str, user_name: str = "a
                 "\n---\n", "SISTEMA:", "INSTRUCTION:", "FONTES:",
                 "\n\nFONTES:", "\n\nPERGUNTA:"
             ],
-            "num_ctx": 2500,
+            "num_ctx": NUM_CTX,
             "num_thread": -1,
             "num_keep": 10,
             "presence_penalty": 0.1, 
             "frequency_penalty": 0.1
         }
     }
+
+def _session_payload(prompt: str, session_id: str, max_tokens: int, temperature: float,
+                     session_prefix: Optional[str], stream: bool = False) -> Dict[str, Any]:
+    """
+    Com `session_prefix`, o primeiro turno da sessão envia as instruções fixas seguidas
+    do prompt; os turnos seguintes enviam só o prompt novo junto do `context` devolvido
+    pelo Ollama no turno anterior, evitando refazer o prefill do histórico.
+    """
+    if session_prefix is None:
+        return _build_payload(prompt, max_tokens, temperature, stream)
+    
+    context = session_contexts.get(session_id, MODEL_NAME)
+    payload = _build_payload(prompt if context else session_prefix + prompt, max_tokens, temperature, stream)
+    # preserva as instruções fixas se o Ollama precisar deslocar a janela de contexto
+    # (3 caracteres por token superestima de propósito)
+    payload["options"]["num_keep"] = max(payload["options"]["num_keep"], len(session_prefix) // 3)
+    if context:
+        payload["context"] = context
+    return payload
+
+
+def _remember_session(session_id: str, payload: Dict[str, Any], data: Dict[str, Any], session_mode: bool) -> None:
+    session_contexts.record(session_id, data, reused="context" in payload)
+    if session_mode and data.get("context"):
+        session_contexts.put(session_id, MODEL_NAME, data["context"])
+
+
+def _discard_context(session_id: str, payload: Dict[str, Any]) -> None:
+    # um contexto que falhou não é reenviado: o próximo turno recomeça com o prompt completo
+    if "context" in payload:
+        session_contexts.drop(session_id)
+
+
+async def generate_from_ollama(prompt: str, session_id: str, user_name: str = "anonymous",
+                               max_tokens: int = 600, temperature: float = 0.15,
+                               priority: int = PRIORITY_INTERACTIVE,
+                               session_prefix: Optional[str] = None,
+                               deadline: Optional[Deadline] = None) -> str:
+    """
+    Cliente Ollama otimizado para prompts estruturados e respostas detalhadas.
+    Ocupa uma vaga do controle de admissão durante todas as tentativas; levanta
+    `OverloadedError` quando não há vaga dentro do orçamento de fila. Com `deadline`,
+    a espera pelo resultado fica limitada ao prazo restante (`DeadlineExceeded`); na
+    geração própria da sessão, fila, timeouts e retentativas também ficam, e
+    um timeout encurtado pelo prazo levanta `GenerationTimeout` (504) sem contar
+    como falha do modelo. Com o disjuntor do modelo aberto, levanta `CircuitOpenError` sem chamar o Ollama.
+    """
+    payload = _session_payload(prompt, session_id, max_tokens, temperature, session_prefix)
+    session_mode = session_prefix is not None
+    
+    cached = await answer_cache.get(payload)
+    if cached is not None:
+        logger.info(f"Resposta em cache - Session: {session_id[:8]}...")
+        return cached
+    
+    async def generate(run_deadline: Optional[Deadline]) -> str:
+        model_breaker.check()
+        async with admission_controller.slot(priority, timeout=run_deadline.remaining() if run_deadline else None):
+            return await _generate_with_retries(payload, prompt, session_id, max_tokens, session_mode, run_deadline)
+    
+    if "context" in payload:
+        # o contexto é da sessão: não há geração equivalente para compartilhar
+        return await generate(deadline)
     
+    # prompts idênticos em andamento compartilham uma única geração. Ela roda sob o prazo
+    # máximo configurado, e não o de quem chegou primeiro, para que um prazo curto não
+    # derrube os demais; cada chamador aplica o próprio prazo só à espera pelo resultado
+    shared = generation_flight.do(
+        answer_cache.key(payload), lambda: generate(Deadline(MAX_CHAT_DEADLINE))
+    )
+    return await (deadline.run(shared, stage="geração") if deadline else shared)
+
+
+async def _retry_sleep(delay: float, deadline: Optional[Deadline]) -> None:
+    if not model_breaker.closed:
+        # o disjuntor abriu durante as tentativas: não insiste contra um servidor doente
+        raise CircuitOpenError(f"Disjuntor {model_breaker.name} aberto")
+    if deadline:
+        deadline.check(delay + MIN_ATTEMPT_SECONDS, "retentativa")
+    await asyncio.sleep(delay)
+
+
+async def _generate_with_retries(payload: Dict[str, Any], prompt: str, session_id: str, max_tokens: int,
+                                 session_mode: bool = False, deadline: Optional[Deadline] = None) -> str:
+    cache_payload = payload
+    affinity = session_id if session_mode else None
     last_error = None
+    quality_retries = 0
     start_time = asyncio.get_event_loop().time()
     
     for attempt in range(MAX_RETRIES):
+        current_timeout = DEFAULT_TIMEOUT - (attempt * 20)  # Reduz timeout nas tentativas
+        deadline_bound = False
+        if deadline:
+            deadline.check(MIN_ATTEMPT_SECONDS, "geração")
+            deadline_bound = deadline.remaining() < current_timeout
+            current_timeout = min(current_timeout, deadline.remaining())
+        
         try:
             logger.info(f"Ollama attempt {attempt + 1}/{MAX_RETRIES} - Session: {session_id[:8]}... - Tokens: {max_tokens}")
             
-            current_timeout = DEFAULT_TIMEOUT - (attempt * 20)  # Reduz timeout nas tentativas
-            timeout = httpx.Timeout(current_timeout, connect=15.0, read=current_timeout)
+            data = await ollama_pool.generate(payload, read_timeout=current_timeout, affinity=affinity,
+                                              deadline_bound=deadline_bound)
             
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                response = await client.post(url, json=payload)
-                response.raise_for_status()
-                data = response.json()
+            if "response" in data and data["response"]:
+                model_breaker.record_success()
+                generated_text = data["response"].strip()
                 
-                if "response" in data and data["response"]:
-                    generated_text = data["response"].strip()
-                    
-                    generated_text = _clean_and_validate_response(generated_text)
-                    
-                    if _is_valid_response(generated_text, prompt):
-                        elapsed = asyncio.get_event_loop().time() - start_time
-                        logger.info(f"Ollama success in {elapsed:.1f}s - {len(generated_text)} chars - Quality: OK")
-                        return generated_text
-                    else:
-                        logger.warning(f"Response quality low, retrying... (attempt {attempt + 1})")
-                        if attempt == MAX_RETRIES - 1:
-                            return generated_text 
-                        await asyncio.sleep(RETRY_DELAY)
-                        continue
-                    
+                generated_text = _clean_and_validate_response(generated_text)
+                
+                if _is_valid_response(generated_text, prompt):
+                    elapsed = asyncio.get_event_loop().time() - start_time
+                    logger.info(f"Ollama success in {elapsed:.1f}s - {len(generated_text)} chars - Quality: OK")
+                    _remember_session(session_id, payload, data, session_mode)
+                    await answer_cache.set(cache_payload, generated_text)
+                    return generated_text
                 else:
-                    logger.error(f"Empty response from Ollama: {data}")
-                    if attempt == MAX_RETRIES - 1:
-                        return "Não consegui gerar uma resposta adequada. Tente reformular sua pergunta."
-                    
+                    quality_retries += 1
+                    if attempt == MAX_RETRIES - 1 or quality_retries > MAX_QUALITY_RETRIES or not model_breaker.closed:
+                        logger.warning(f"Response quality low, returning as is (attempt {attempt + 1})")
+                        return generated_text 
+                    logger.warning(f"Response quality low, retrying... (attempt {attempt + 1})")
+                    await _retry_sleep(RETRY_DELAY, deadline)
+                    continue
+                
+            else:
+                logger.error(f"Empty response from Ollama: {data}")
+                model_breaker.record_failure(RuntimeError("resposta vazia do modelo"))
+                if attempt == MAX_RETRIES - 1:
+                    return "Não consegui gerar uma resposta adequada. Tente reformular sua pergunta."
+                
+        except (DeadlineExceeded, CircuitOpenError):
+            raise
+                
         except httpx.TimeoutException as e:
             last_error = e
+            _discard_context(session_id, payload)
+            if deadline_bound and isinstance(e, httpx.ReadTimeout):
+                # o prazo do cliente encurtou o timeout: problema desta requisição, não do modelo
+                logger.warning(f"Timeout de {current_timeout:.1f}s imposto pelo prazo - Session: {session_id[:8]}...")
+                raise GenerationTimeout(current_timeout) from e
+            model_breaker.record_failure(e)
             elapsed = asyncio.get_event_loop().time() - start_time
             logger.warning(f"Timeout após {elapsed:.1f}s - Tentativa {attempt + 1}/{MAX_RETRIES}")
             
             if attempt == MAX_RETRIES - 1:
                 return "O modelo está demorando muito para responder. Tente uma pergunta mais específica."
             
-            await asyncio.sleep(RETRY_DELAY)
+            await _retry_sleep(RETRY_DELAY, deadline)
                 
         except httpx.HTTPStatusError as e:
             last_error = e
+            _discard_context(session_id, payload)
             logger.error(f"HTTP {e.response.status_code}: {e.response.text}")
+            if e.response.status_code >= 500:
+                model_breaker.record_failure(e)
             
             if e.response.status_code == 404:
                 return f"Modelo {MODEL_NAME} não encontrado. Verifique a instalação do Ollama."
             elif e.response.status_code == 500:
                 if attempt == MAX_RETRIES - 1:
                     return "Servidor do modelo sobrecarregado. Tente novamente em alguns minutos."
-                await asyncio.sleep(RETRY_DELAY * 2)
+                await _retry_sleep(RETRY_DELAY * 2, deadline)
             elif e.response.status_code == 413:
                 if max_tokens > 300:
-                    payload["options"]["num_predict"] = max_tokens // 2
+                    payload = {**payload, "options": {**payload["options"], "num_predict": max_tokens // 2}}
                     logger.info(f"Reduzindo tokens para {payload['options']['num_predict']} devido ao erro 413")
                     continue
                 else:
@@ -109,30 +229,144 @@ async def generate_from_ollama(prompt: str, session_id: str, user_name: str = "a
             else:
                 if attempt == MAX_RETRIES - 1:
                     return "Erro de comunicação com o modelo. Tente novamente."
-                await asyncio.sleep(RETRY_DELAY)
+                await _retry_sleep(RETRY_DELAY, deadline)
                     
         except Exception as e:
             last_error = e
+            model_breaker.record_failure(e)
             logger.error(f"Unexpected error: {str(e)}")
             if attempt == MAX_RETRIES - 1:
                 return "Erro interno do sistema. Contate o suporte se persistir."
-            await asyncio.sleep(RETRY_DELAY)
+            await _retry_sleep(RETRY_DELAY, deadline)
     
     logger.error(f"All attempts failed for session {session_id}: {str(last_error)}")
     return "Sistema temporariamente indisponível. Tente reformular sua pergunta."
 
+async def stream_from_ollama(prompt: str, session_id: str, user_name: str = "anonymous",
+                             max_tokens: int = 600, temperature: float = 0.15,
+                             priority: int = PRIORITY_INTERACTIVE,
+                             session_prefix: Optional[str] = None,
+                             deadline: Optional[Deadline] = None) -> AsyncIterator[str]:
+    """
+    Gera a resposta em modo stream, repassando os fragmentos do Ollama conforme chegam.
+    Sem retentativas: uma falha depois do primeiro fragmento não pode ser desfeita.
+    Com `deadline`, o stream é encerrado quando o prazo acaba. Com o disjuntor do
+    modelo aberto, levanta `CircuitOpenError` antes do primeiro fragmento.
+    """
+    payload = _session_payload(prompt, session_id, max_tokens, temperature, session_prefix, stream=True)
+    session_mode = session_prefix is not None
+    
+    cached = await answer_cache.get(payload)
+    if cached is not None:
+        logger.info(f"Resposta em cache - Session: {session_id[:8]}...")
+        yield cached
+        return
+    
+    parts = []
+    final: Dict[str, Any] = {}
+    model_breaker.check()
+    async with admission_controller.slot(priority, timeout=deadline.remaining() if deadline else None):
+        try:
+            async for chunk in _stream_chunks(payload, session_id, max_tokens, final,
+                                              affinity=session_id if session_mode else None,
+                                              deadline=deadline):
+                parts.append(chunk)
+                yield chunk
+        except GenerationTimeout:
+            _discard_context(session_id, payload)
+            raise
+        except Exception as e:
+            model_breaker.record_failure(e)
+            _discard_context(session_id, payload)
+            raise
+    
+    if not final:
+        return  # stream cortado pelo prazo: resposta parcial não é guardada
+    model_breaker.record_success()
+    _remember_session(session_id, payload, final, session_mode)
+    generated_text = _clean_and_validate_response("".join(parts).strip())
+    if _is_valid_response(generated_text, prompt):
+        await answer_cache.set(payload, generated_text)
+
+
+async def _stream_chunks(payload: Dict[str, Any], session_id: str, max_tokens: int,
+                         final: Dict[str, Any], affinity: Optional[str] = None,
+                         deadline: Optional[Deadline] = None) -> AsyncIterator[str]:
+    start_time = asyncio.get_event_loop().time()
+    first_chunk_at = None
+    read_timeout = min(DEFAULT_TIMEOUT, deadline.remaining()) if deadline else None
+    deadline_bound = read_timeout is not None and read_timeout < DEFAULT_TIMEOUT
+    
+    logger.info(f"Ollama stream - Session: {session_id[:8]}... - Tokens: {max_tokens}")
+    
+    stream = ollama_pool.stream_generate(payload, read_timeout=read_timeout, affinity=affinity,
+                                         deadline_bound=deadline_bound)
+    try:
+        async for data in stream:
+            if deadline and deadline.expired:
+                logger.warning(f"Stream encerrado pelo prazo - Session: {session_id[:8]}...")
+                break
+            if data.get("error"):
+                raise RuntimeError(data["error"])
+            
+            chunk = data.get("response")
+            if chunk:
+                if first_chunk_at is None:
+                    first_chunk_at = asyncio.get_event_loop().time()
+                    logger.info(f"Ollama stream first token in {first_chunk_at - start_time:.2f}s")
+                yield chunk
+            
+            if data.get("done"):
+                final.update(data)
+                break
+    except httpx.ReadTimeout as e:
+        if not deadline_bound:
+            raise
+        logger.warning(f"Timeout de {read_timeout:.1f}s imposto pelo prazo no stream - Session: {session_id[:8]}...")
+        raise GenerationTimeout(read_timeout) from e
+    finally:
+        # encerra a resposta HTTP mesmo quando o laço termina antes do fim do stream
+        await stream.aclose()
+    
+    elapsed = asyncio.get_event_loop().time() - start_time
+    logger.info(f"Ollama stream finished in {elapsed:.1f}s")
+
+
+class StreamCleaner:
+    """
+    Aplica a remoção de vazamentos de prompt de forma incremental. Retém no buffer
+    o suficiente para que um marcador dividido entre fragmentos nunca seja emitido
+    pela metade.
+    """
+    
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._holdback = max(len(leak) for leak in PROMPT_LEAKS)
+    
+    def _scrub(self, text: str) -> str:
+        for leak in PROMPT_LEAKS:
+            text = text.replace(leak, '')
+        while '\n\n\n' in text:
+            text = text.replace('\n\n\n', '\n\n')
+        return text
+    
+    def feed(self, chunk: str) -> str:
+        self._buffer = self._scrub(self._buffer + chunk)
+        if len(self._buffer) <= self._holdback:
+            return ""
+        ready, self._buffer = self._buffer[:-self._holdback], self._buffer[-self._holdback:]
+        return ready
+    
+    def flush(self) -> str:
+        ready, self._buffer = self._scrub(self._buffer), ""
+        return ready
+
 def _clean_and_validate_response(text: str) -> str:
     """Limpeza avançada e validação da resposta"""
     if not text:
         return text
     
-    prompt_leaks = [
-        'SISTEMA:', 'FONTES:', 'INSTRUÇÃO:', 'RESPOSTA:', 'PERGUNTA:',
-        'USER:', 'USUÁRIO:', 'ASSISTANT:', 'AI:', 'BOT:',
-        'TIPO:', 'TÍTULO:', 'DADOS:', 'CONTEXTO:', 'REGRAS:'
-    ]
-    
-    for leak in prompt_leaks:
+    for leak in PROMPT_LEAKS:
         text = text.replace(f'\n{leak}', '\n').replace(f'{leak}', '')
     
     text = text.replace('\n\n\n\n', '\n\n').replace('\n\n\n', '\n\n')
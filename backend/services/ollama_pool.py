@@ -0,0 +1,325 @@
+"""
+Conexões com os servidores Ollama: cliente HTTP com keep-alive por servidor e pool
+de servidores com health check e roteamento para o menos carregado.
+"""
+
+import os
+import json
+import time
+import httpx
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, List, Optional, Any
+
+from backend.services.memory_cache import MemoryCache
+
+logger = logging.getLogger(__name__)
+
+MODEL_SERVERS = [
+    url.strip().rstrip("/")
+    for url in os.getenv("MODEL_SERVER_URLS", os.getenv("MODEL_SERVER_URL", "http://ollama:11434")).split(",")
+    if url.strip()
+]
+REQUEST_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "180"))
+CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "15"))
+POOL_TIMEOUT = float(os.getenv("OLLAMA_POOL_TIMEOUT", "30"))
+MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "16"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OLLAMA_MAX_KEEPALIVE_CONNECTIONS", "8"))
+KEEPALIVE_EXPIRY = float(os.getenv("OLLAMA_KEEPALIVE_EXPIRY", "60"))
+HEALTH_CHECK_INTERVAL = float(os.getenv("OLLAMA_HEALTH_CHECK_INTERVAL", "10"))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("OLLAMA_HEALTH_CHECK_TIMEOUT", "3"))
+EJECT_AFTER_FAILURES = int(os.getenv("OLLAMA_EJECT_AFTER_FAILURES", "3"))
+LATENCY_EWMA_ALPHA = 0.3
+AFFINITY_SLACK = 1
+AFFINITY_MAX_ENTRIES = 4096
+AFFINITY_TTL = 1800
+
+
+class OllamaClient:
+    """
+    Cliente HTTP de longa duração para o Ollama. Mantém um único `httpx.AsyncClient`
+    com pool de conexões keep-alive, aberto e fechado no lifespan da aplicação.
+    """
+    
+    def __init__(
+        self,
+        base_url: str,
+        max_connections: int = MAX_CONNECTIONS,
+        max_keepalive_connections: int = MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = KEEPALIVE_EXPIRY,
+        timeout: float = REQUEST_TIMEOUT,
+    ) -> None:
+        self.base_url = base_url
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout, connect=CONNECT_TIMEOUT, pool=POOL_TIMEOUT)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._requests = 0
+        self._errors = 0
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._total_seconds = 0.0
+    
+    async def start(self) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.base_url, limits=self.limits, timeout=self.timeout)
+            logger.info(f"Cliente Ollama iniciado ({self.base_url}, até {self.limits.max_connections} conexões)")
+    
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # scripts fora do servidor não passam pelo lifespan; o cliente é criado sob demanda
+        if self._client is None:
+            self._client = httpx.AsyncClient(base_url=self.base_url, limits=self.limits, timeout=self.timeout)
+        return self._client
+    
+    def _request_timeout(self, read_timeout: Optional[float]) -> httpx.Timeout:
+        if read_timeout is None:
+            return self.timeout
+        return httpx.Timeout(read_timeout, connect=CONNECT_TIMEOUT, pool=POOL_TIMEOUT)
+    
+    def _enter(self) -> float:
+        self._requests += 1
+        self._in_flight += 1
+        self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        return time.perf_counter()
+    
+    def _exit(self, started: float, failed: bool) -> None:
+        self._in_flight -= 1
+        self._total_seconds += time.perf_counter() - started
+        if failed:
+            self._errors += 1
+    
+    async def generate(self, payload: Dict[str, Any], read_timeout: Optional[float] = None) -> Dict[str, Any]:
+        started = self._enter()
+        failed = True
+        try:
+            response = await self.client.post("/api/generate", json=payload, timeout=self._request_timeout(read_timeout))
+            response.raise_for_status()
+            data = response.json()
+            failed = False
+            return data
+        finally:
+            self._exit(started, failed)
+    
+    async def stream_generate(self, payload: Dict[str, Any], read_timeout: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Itera sobre as linhas NDJSON de `/api/generate` com `stream: true`."""
+        started = self._enter()
+        failed = True
+        try:
+            async with self.client.stream(
+                "POST", "/api/generate", json=payload, timeout=self._request_timeout(read_timeout)
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line:
+                        yield json.loads(line)
+            failed = False
+        finally:
+            self._exit(started, failed)
+    
+    def _pool_stats(self) -> Dict[str, int]:
+        # o httpx não expõe o pool publicamente; lê o pool do httpcore quando disponível
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+        idle = sum(1 for c in connections if getattr(c, "is_idle", lambda: False)())
+        return {"connections": len(connections), "idle_connections": idle}
+    
+    def stats(self) -> Dict[str, Any]:
+        completed = self._requests - self._in_flight
+        return {
+            "base_url": self.base_url,
+            "started": self._client is not None,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "keepalive_expiry": self.limits.keepalive_expiry,
+            "requests": self._requests,
+            "errors": self._errors,
+            "in_flight": self._in_flight,
+            "peak_in_flight": self._peak_in_flight,
+            "avg_request_seconds": round(self._total_seconds / completed, 3) if completed else 0.0,
+            **self._pool_stats(),
+        }
+
+
+class NoHealthyBackendError(RuntimeError):
+    pass
+
+
+class OllamaBackend:
+    """Um servidor do pool: cliente próprio, estado de saúde e latência recente."""
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self.client = OllamaClient(url)
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.latency_ewma: Optional[float] = None
+        self.ejections = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def in_flight(self) -> int:
+        return self.client._in_flight
+
+    def load_key(self) -> tuple:
+        # menos requisições em andamento primeiro; no empate, menor latência recente
+        return (self.in_flight, self.latency_ewma if self.latency_ewma is not None else 0.0)
+
+    def record_success(self, seconds: float) -> None:
+        self.consecutive_failures = 0
+        if self.latency_ewma is None:
+            self.latency_ewma = seconds
+        else:
+            self.latency_ewma = LATENCY_EWMA_ALPHA * seconds + (1 - LATENCY_EWMA_ALPHA) * self.latency_ewma
+
+    def record_failure(self, exc: BaseException, eject: bool = False) -> None:
+        self.consecutive_failures += 1
+        self.last_error = str(exc) or exc.__class__.__name__
+        if self.healthy and (eject or self.consecutive_failures >= EJECT_AFTER_FAILURES):
+            self.healthy = False
+            self.ejections += 1
+            logger.warning(f"Servidor Ollama {self.url} removido do pool: {self.last_error}")
+
+    def readmit(self) -> None:
+        if not self.healthy:
+            logger.info(f"Servidor Ollama {self.url} readmitido no pool")
+        self.healthy = True
+        self.consecutive_failures = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "healthy": self.healthy,
+            "consecutive_failures": self.consecutive_failures,
+            "latency_ewma_seconds": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            "ejections": self.ejections,
+            "last_error": self.last_error,
+            **self.client.stats(),
+        }
+
+
+def _is_backend_failure(exc: BaseException, deadline_bound: bool = False) -> bool:
+    """
+    Erros que indicam problema no servidor, e não no pedido. Com `deadline_bound`, o
+    timeout de leitura foi encurtado pelo prazo do cliente e estourá-lo não diz nada
+    sobre a saúde do servidor.
+    """
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    if deadline_bound and isinstance(exc, httpx.ReadTimeout):
+        return False
+    return isinstance(exc, httpx.TransportError)
+
+
+class OllamaPool:
+    """
+    Distribui as gerações entre vários servidores Ollama (`MODEL_SERVER_URLS`,
+    separados por vírgula). Cada pedido vai para o servidor saudável menos carregado;
+    servidores com falhas seguidas são removidos e voltam quando o health check
+    periódico (`/api/version`) responder.
+    """
+
+    def __init__(self, urls: List[str] = MODEL_SERVERS, health_interval: float = HEALTH_CHECK_INTERVAL) -> None:
+        self.backends = [OllamaBackend(url) for url in urls]
+        self.health_interval = health_interval
+        self._health_task: Optional[asyncio.Task] = None
+        self._affinity = MemoryCache(max_entries=AFFINITY_MAX_ENTRIES, ttl_seconds=AFFINITY_TTL)
+
+    async def start(self) -> None:
+        for backend in self.backends:
+            await backend.client.start()
+        if self._health_task is None and len(self.backends) > 0 and self.health_interval > 0:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def close(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        for backend in self.backends:
+            await backend.client.close()
+
+    async def check_backend(self, backend: OllamaBackend) -> bool:
+        try:
+            response = await backend.client.client.get("/api/version", timeout=HEALTH_CHECK_TIMEOUT)
+            response.raise_for_status()
+        except Exception as exc:
+            backend.record_failure(exc, eject=True)
+            return False
+        backend.readmit()
+        return True
+
+    async def check_all(self) -> None:
+        await asyncio.gather(*(self.check_backend(b) for b in self.backends))
+
+    async def _health_loop(self) -> None:
+        while True:
+            try:
+                await self.check_all()
+            except Exception as exc:
+                logger.error(f"Erro no health check do pool Ollama: {exc}")
+            await asyncio.sleep(self.health_interval)
+
+    def pick(self, affinity: Optional[str] = None) -> OllamaBackend:
+        candidates = [b for b in self.backends if b.healthy]
+        if not candidates:
+            if not self.backends:
+                raise NoHealthyBackendError("Nenhum servidor Ollama configurado")
+            # todos fora: tenta o que falhou há menos tempo em vez de recusar de vez
+            candidates = sorted(self.backends, key=lambda b: b.consecutive_failures)[:1]
+        chosen = min(candidates, key=lambda b: b.load_key())
+
+        if affinity is not None:
+            # a sessão volta ao servidor que já tem seu contexto em cache, salvo se ele
+            # estiver claramente mais carregado que o melhor disponível
+            previous = self._affinity.get(affinity)
+            preferred = next((b for b in candidates if b.url == previous), None)
+            if preferred is not None and preferred.in_flight <= chosen.in_flight + AFFINITY_SLACK:
+                chosen = preferred
+            self._affinity.set(affinity, chosen.url)
+        return chosen
+
+    async def generate(self, payload: Dict[str, Any], read_timeout: Optional[float] = None,
+                       affinity: Optional[str] = None, deadline_bound: bool = False) -> Dict[str, Any]:
+        backend = self.pick(affinity)
+        started = time.perf_counter()
+        try:
+            data = await backend.client.generate(payload, read_timeout=read_timeout)
+        except Exception as exc:
+            if _is_backend_failure(exc, deadline_bound):
+                backend.record_failure(exc, eject=isinstance(exc, httpx.ConnectError))
+            raise
+        backend.record_success(time.perf_counter() - started)
+        return data
+
+    async def stream_generate(self, payload: Dict[str, Any], read_timeout: Optional[float] = None,
+                              affinity: Optional[str] = None, deadline_bound: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        backend = self.pick(affinity)
+        started = time.perf_counter()
+        try:
+            async for data in backend.client.stream_generate(payload, read_timeout=read_timeout):
+                yield data
+        except Exception as exc:
+            if _is_backend_failure(exc, deadline_bound):
+                backend.record_failure(exc, eject=isinstance(exc, httpx.ConnectError))
+            raise
+        backend.record_success(time.perf_counter() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "healthy_backends": sum(1 for b in self.backends if b.healthy),
+            "backends": {b.url: b.stats() for b in self.backends},
+        }
+
+
+ollama_pool = OllamaPool()
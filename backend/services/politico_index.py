@@ -0,0 +1,258 @@
+"""
+Índice em memória dos nomes de políticos para detectar menções em mensagens de chat
+sem ir ao banco
+"""
+
+import re
+import time
+import asyncio
+import logging
+import unicodedata
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import select
+
+from backend.db.database import AsyncSessionLocal
+from backend.models.models import Politico
+from backend.services.data_version import data_version
+
+logger = logging.getLogger(__name__)
+
+# conectivos ignorados tanto nos nomes quanto nas mensagens ("Arthur de Lira" == "Arthur Lira")
+CONNECTORS = {"de", "da", "do", "das", "dos", "e", "di", "du"}
+# títulos comuns em nomes parlamentares: sozinhos não identificam ninguém
+TITLES = {
+    "pastor", "pastora", "delegado", "delegada", "coronel", "capitao", "general", "major",
+    "tenente", "sargento", "cabo", "professor", "professora", "doutor", "doutora", "dr", "dra",
+    "padre", "bispo", "irmao", "irma", "missionario", "deputado", "deputada", "senador", "senadora",
+}
+MIN_SINGLE_TOKEN_CHARS = 5
+
+_TERMINAL = ""  # chave dos ids no nó do trie (nenhum token é vazio)
+
+INDEX_COLUMNS = (
+    Politico.id,
+    Politico.id_camara,
+    Politico.nome,
+    Politico.partido,
+    Politico.uf,
+    Politico.cargo,
+    Politico.ativo,
+    Politico.biografia_resumo,
+)
+
+
+def fold(text: Optional[str]) -> List[str]:
+    """Minúsculas, sem acentos e sem pontuação, separado em tokens e sem conectivos."""
+    if not text:
+        return []
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    ascii_text = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return [t for t in re.split(r"[^a-z0-9]+", ascii_text) if t and t not in CONNECTORS]
+
+
+def name_aliases(nome: str) -> Set[Tuple[str, ...]]:
+    """
+    Formas pelas quais um nome pode aparecer: todos os n-gramas contíguos com dois
+    ou mais tokens, primeiro + último nome e tokens isolados longos que não são títulos.
+    """
+    tokens = fold(nome)
+    aliases: Set[Tuple[str, ...]] = set()
+    for size in range(2, len(tokens) + 1):
+        for start in range(len(tokens) - size + 1):
+            aliases.add(tuple(tokens[start:start + size]))
+    if len(tokens) > 2:
+        aliases.add((tokens[0], tokens[-1]))
+    for token in tokens:
+        if len(token) >= MIN_SINGLE_TOKEN_CHARS and token not in TITLES:
+            aliases.add((token,))
+    return aliases
+
+
+def _record(row: Any) -> Dict[str, Any]:
+    return {
+        "id": str(row["id"]),
+        "id_camara": row["id_camara"],
+        "nome": row["nome"],
+        "partido": row["partido"],
+        "uf": row["uf"],
+        "cargo": row["cargo"],
+        "ativo": row["ativo"],
+        "biografia_resumo": row["biografia_resumo"],
+    }
+
+
+class PoliticoNameIndex:
+    """
+    Trie de tokens com os apelidos de cada político. A busca percorre a mensagem uma
+    vez, tentando a partir de cada token o apelido mais longo (limitado ao maior
+    apelido do índice), então o custo é linear no tamanho da mensagem. Um token isolado
+    só conta quando aponta para um único político.
+
+    O índice é carregado uma vez do banco e recarregado em segundo plano quando a versão
+    da tabela `politicos` muda. As escritas do `PoliticoService` deste processo também
+    o atualizam na hora, para valerem já na próxima mensagem em vez de só depois dessa
+    recarga.
+    """
+
+    def __init__(self) -> None:
+        self._root: Dict[str, Any] = {}
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._aliases: Dict[str, Set[Tuple[str, ...]]] = {}
+        self._max_alias_tokens = 0
+        self._version: Optional[str] = None
+        self._load_lock: Optional[asyncio.Lock] = None
+        self._reload_task: Optional[asyncio.Task] = None
+        self.loaded = False
+        self.loads = 0
+        self.incremental_updates = 0
+        self.last_load_ms = 0.0
+        self.lookups = 0
+        self.total_lookup_us = 0.0
+
+    def _insert(self, politico_id: str, alias: Tuple[str, ...]) -> None:
+        node = self._root
+        for token in alias:
+            node = node.setdefault(token, {})
+        node.setdefault(_TERMINAL, set()).add(politico_id)
+        self._max_alias_tokens = max(self._max_alias_tokens, len(alias))
+
+    def _discard(self, politico_id: str, alias: Tuple[str, ...]) -> None:
+        node = self._root
+        for token in alias:
+            node = node.get(token)
+            if node is None:
+                return
+        node.get(_TERMINAL, set()).discard(politico_id)
+
+    def upsert(self, record: Dict[str, Any]) -> None:
+        """Inclui ou atualiza um político (dicionário com as colunas de `INDEX_COLUMNS`)."""
+        politico_id = str(record["id"])
+        self.remove(politico_id)
+        aliases = name_aliases(record.get("nome") or "")
+        for alias in aliases:
+            self._insert(politico_id, alias)
+        self._aliases[politico_id] = aliases
+        self._records[politico_id] = {**record, "id": politico_id}
+        self.incremental_updates += 1
+
+    def remove(self, politico_id: Any) -> None:
+        politico_id = str(politico_id)
+        for alias in self._aliases.pop(politico_id, ()):
+            self._discard(politico_id, alias)
+        self._records.pop(politico_id, None)
+
+    def upsert_orm(self, politico: Politico) -> None:
+        self.upsert({column.key: getattr(politico, column.key) for column in INDEX_COLUMNS})
+
+    async def load(self) -> None:
+        started = time.perf_counter()
+        version = await data_version.current()
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(select(*INDEX_COLUMNS))).mappings().all()
+
+        root: Dict[str, Any] = {}
+        aliases_by_id: Dict[str, Set[Tuple[str, ...]]] = {}
+        records: Dict[str, Dict[str, Any]] = {}
+        max_tokens = 0
+        for row in rows:
+            record = _record(row)
+            aliases = name_aliases(record["nome"] or "")
+            for alias in aliases:
+                node = root
+                for token in alias:
+                    node = node.setdefault(token, {})
+                node.setdefault(_TERMINAL, set()).add(record["id"])
+                max_tokens = max(max_tokens, len(alias))
+            aliases_by_id[record["id"]] = aliases
+            records[record["id"]] = record
+
+        # troca atômica para o event loop: buscas em andamento veem o índice antigo ou o novo
+        self._root, self._aliases, self._records, self._max_alias_tokens = root, aliases_by_id, records, max_tokens
+        self._version = version.token("politicos") if version else None
+        self.loaded = True
+        self.loads += 1
+        self.last_load_ms = (time.perf_counter() - started) * 1000.0
+        logger.info(f"Índice de nomes carregado: {len(records)} políticos em {self.last_load_ms:.0f}ms")
+
+    async def start(self) -> None:
+        """Carga inicial na subida da aplicação; se o banco não responder, fica para a primeira busca."""
+        try:
+            await self._ensure_loaded()
+        except Exception as exc:
+            logger.warning(f"Índice de nomes não carregado na inicialização: {exc}")
+
+    async def _ensure_loaded(self) -> None:
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        async with self._load_lock:
+            if not self.loaded:
+                await self.load()
+
+    async def _reload(self) -> None:
+        try:
+            await self.load()
+        except Exception as exc:
+            logger.error(f"Erro ao recarregar o índice de nomes: {exc}")
+
+    async def refresh(self) -> None:
+        """Carrega na primeira vez; depois, só agenda recarga se a versão dos dados mudou."""
+        if not self.loaded:
+            await self._ensure_loaded()
+            return
+        version = await data_version.current()
+        token = version.token("politicos") if version else None
+        if token != self._version and (self._reload_task is None or self._reload_task.done()):
+            self._reload_task = asyncio.ensure_future(self._reload())
+
+    def match(self, message: str, active_only: bool = True) -> List[Dict[str, Any]]:
+        """Políticos mencionados em `message`, na ordem em que aparecem."""
+        started = time.perf_counter()
+        tokens = fold(message)
+        found: List[Dict[str, Any]] = []
+        seen: Set[str] = set()
+        i = 0
+        while i < len(tokens):
+            node = self._root
+            best: Optional[Tuple[int, Set[str]]] = None
+            for j in range(i, min(len(tokens), i + self._max_alias_tokens)):
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                ids = node.get(_TERMINAL)
+                if ids and (j > i or len(ids) == 1):
+                    best = (j + 1, ids)
+            if best is None:
+                i += 1
+                continue
+            end, ids = best
+            for politico_id in sorted(ids):
+                record = self._records.get(politico_id)
+                if record is None or politico_id in seen or (active_only and record.get("ativo") is False):
+                    continue
+                seen.add(politico_id)
+                found.append({**record, "similarity": 1.0, "matched": " ".join(tokens[i:end])})
+            i = end
+        self.lookups += 1
+        self.total_lookup_us += (time.perf_counter() - started) * 1_000_000
+        return found
+
+    async def find(self, message: str) -> List[Dict[str, Any]]:
+        await self.refresh()
+        return self.match(message)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": self.loaded,
+            "politicos": len(self._records),
+            "max_alias_tokens": self._max_alias_tokens,
+            "data_version": self._version,
+            "loads": self.loads,
+            "last_load_ms": round(self.last_load_ms, 1),
+            "incremental_updates": self.incremental_updates,
+            "lookups": self.lookups,
+            "avg_lookup_us": round(self.total_lookup_us / self.lookups, 1) if self.lookups else 0.0,
+        }
+
+
+politico_index = PoliticoNameIndex()
@@ -1,15 +1,61 @@
+import json
+import base64
 import logging
+import binascii
 from uuid import UUID
-from typing import List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 from fastapi import HTTPException
+from sqlalchemy import and_, or_, select
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 
 from backend.schemas.politico import PoliticoCreate, PoliticoUpdate, PoliticoRead
 from backend.models.models import Politico
+from backend.services.data_version import data_version
+from backend.services.politico_index import politico_index
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+# vetores só saem quando pedidos explicitamente em `fields`
+VECTOR_FIELDS = {"embedding_ideologia"}
+LISTING_FIELDS = tuple(PoliticoRead.model_fields)
+DEFAULT_LISTING_FIELDS = ("id", *(f for f in LISTING_FIELDS if f != "id" and f not in VECTOR_FIELDS))
+
+
+def _encode_cursor(nome: str, politico_id: UUID) -> str:
+    raw = json.dumps([nome, str(politico_id)], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        nome, politico_id = json.loads(raw)
+        return str(nome), UUID(politico_id)
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise HTTPException(400, "Cursor inválido") from e
+
+
+def _parse_fields(fields: Optional[str]) -> Tuple[str, ...]:
+    if not fields:
+        return DEFAULT_LISTING_FIELDS
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    invalid = [f for f in requested if f not in LISTING_FIELDS]
+    if invalid:
+        raise HTTPException(400, f"Campos inválidos: {', '.join(invalid)}. Disponíveis: {', '.join(LISTING_FIELDS)}")
+    # o id sempre acompanha a linha
+    return tuple(dict.fromkeys(["id", *requested]))
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, UUID):
+        return str(value)
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return value
+
 
 class PoliticoService:
     """Serviço para políticos usando SQLAlchemy."""
@@ -28,6 +74,58 @@ class PoliticoService:
             logger.error("Erro ao listar políticos: %s", str(e))
             raise HTTPException(500, "Erro interno ao buscar políticos") from e
 
+    @staticmethod
+    def listar_politicos_paginado(
+        db: Session,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        fields: Optional[str] = None,
+        partido: Optional[str] = None,
+        uf: Optional[str] = None,
+        cargo: Optional[str] = None,
+        ativo: Optional[bool] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Página de políticos ordenada por (nome, id), com paginação por cursor (keyset):
+        devolve as linhas, só com as colunas de `fields`, e o cursor da próxima página.
+        Sem `limit` nem `cursor`, devolve todos os políticos filtrados numa única página,
+        como a listagem antiga.
+        """
+        selected = _parse_fields(fields)
+        paginate = limit is not None or cursor is not None
+        limit = max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+        # nome e id entram sempre no SELECT porque formam o cursor
+        columns = list(dict.fromkeys(["id", "nome", *selected]))
+        stmt = select(*(getattr(Politico, c) for c in columns))
+
+        if partido:
+            stmt = stmt.where(Politico.partido.ilike(partido.strip()))
+        if uf:
+            stmt = stmt.where(Politico.uf == uf.strip().upper())
+        if cargo:
+            stmt = stmt.where(Politico.cargo == cargo)
+        if ativo is not None:
+            stmt = stmt.where(Politico.ativo.is_(ativo))
+        if cursor:
+            nome, politico_id = _decode_cursor(cursor)
+            stmt = stmt.where(or_(
+                Politico.nome > nome,
+                and_(Politico.nome == nome, Politico.id > politico_id),
+            ))
+        stmt = stmt.order_by(Politico.nome, Politico.id)
+        if paginate:
+            stmt = stmt.limit(limit + 1)
+
+        try:
+            rows = db.execute(stmt).mappings().all()
+        except SQLAlchemyError as e:
+            logger.error("Erro ao listar políticos: %s", str(e))
+            raise HTTPException(500, "Erro interno ao buscar políticos") from e
+
+        page = rows[:limit] if paginate else rows
+        next_cursor = _encode_cursor(page[-1]["nome"], page[-1]["id"]) if len(page) < len(rows) else None
+        return [{c: _json_value(r[c]) for c in selected} for r in page], next_cursor
+
     @staticmethod
     def buscar_politico_por_id(db: Session, politico_id: UUID) -> Optional[PoliticoRead]:
         try:
@@ -51,6 +149,8 @@ class PoliticoService:
             db.add(novo)
             db.commit()
             db.refresh(novo)
+            data_version.invalidate()
+            politico_index.upsert_orm(novo)
             return PoliticoService._to_read(novo)
         except SQLAlchemyError as e:
             db.rollback()
@@ -68,6 +168,8 @@ class PoliticoService:
                 setattr(p, campo, valor)
             db.commit()
             db.refresh(p)
+            data_version.invalidate()
+            politico_index.upsert_orm(p)
             return PoliticoService._to_read(p)
         except SQLAlchemyError as e:
             db.rollback()
@@ -97,6 +199,8 @@ class PoliticoService:
         try:
             db.delete(p)
             db.commit()
+            data_version.invalidate()
+            politico_index.remove(politico_id)
             return True
         except SQLAlchemyError as e:
             db.rollback()
@@ -0,0 +1,102 @@
+"""
+Montagem de prompts com orçamento de tokens dentro da janela de contexto do modelo
+"""
+
+import os
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.services.ollama_client import NUM_CTX
+
+CHARS_PER_TOKEN = float(os.getenv("PROMPT_CHARS_PER_TOKEN", "3.5"))
+SAFETY_MARGIN_TOKENS = 64
+MIN_PROMPT_TOKENS = 512
+
+
+def fits_in_context(reserved: int, max_tokens: int, num_ctx: int = NUM_CTX) -> bool:
+    """Se ainda cabe um prompt mínimo depois de `reserved` tokens e da resposta."""
+    return num_ctx - reserved - max_tokens - SAFETY_MARGIN_TOKENS >= MIN_PROMPT_TOKENS
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa barata para português no tokenizador do llama: ~3,5 caracteres por token."""
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    max_chars = max(0, int(max_tokens * CHARS_PER_TOKEN) - 3)
+    cut = text[:max_chars]
+    # evita cortar no meio de uma palavra
+    if " " in cut[max_chars // 2:]:
+        cut = cut[:cut.rfind(" ")]
+    return cut.rstrip() + "..."
+
+
+class PromptBudget:
+    """
+    Orçamento de tokens de um prompt: a janela de contexto menos o espaço reservado
+    para a resposta e para o que já ocupa a janela (contexto da sessão, instruções
+    fixas). Cada seção consome parte do orçamento e fica registrada no relatório,
+    que informa o tamanho estimado do prompt final.
+    """
+
+    def __init__(self, max_tokens: int, num_ctx: int = NUM_CTX, reserved: int = 0) -> None:
+        self.total = max(MIN_PROMPT_TOKENS, num_ctx - reserved - max_tokens - SAFETY_MARGIN_TOKENS)
+        self.reserved = reserved
+        self.used = 0
+        self.sections: Dict[str, int] = {}
+        self.items: Dict[str, Tuple[int, int]] = {}
+        self.truncated: List[str] = []
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.total - self.used)
+
+    def _spend(self, name: str, tokens: int) -> None:
+        self.used += tokens
+        self.sections[name] = self.sections.get(name, 0) + tokens
+
+    def take(self, name: str, text: str) -> str:
+        """Seção obrigatória (instruções, pergunta): entra inteira."""
+        self._spend(name, estimate_tokens(text))
+        return text
+
+    def take_truncated(self, name: str, text: str, max_tokens: int) -> str:
+        """Seção de texto livre, cortada para caber em `max_tokens` e no restante do orçamento."""
+        limit = min(max_tokens, self.remaining)
+        fitted = truncate_to_tokens(text or "", limit)
+        if fitted != (text or ""):
+            self.truncated.append(name)
+        self._spend(name, estimate_tokens(fitted))
+        return fitted
+
+    def take_lines(self, name: str, lines: List[str], max_tokens: Optional[int] = None) -> List[str]:
+        """Inclui linhas na ordem dada enquanto couberem (+1 token pela quebra de linha)."""
+        limit = self.remaining if max_tokens is None else min(max_tokens, self.remaining)
+        chosen: List[str] = []
+        spent = 0
+        for line in lines:
+            cost = estimate_tokens(line) + 1
+            if spent + cost > limit:
+                break
+            chosen.append(line)
+            spent += cost
+        if len(chosen) < len(lines):
+            self.truncated.append(name)
+        self.items[name] = (len(chosen), len(lines))
+        self._spend(name, spent)
+        return chosen
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "budget_tokens": self.total,
+            "reserved_tokens": self.reserved,
+            "estimated_tokens": self.used,
+            "sections": dict(self.sections),
+            "items": {name: {"included": inc, "total": tot} for name, (inc, tot) in self.items.items()},
+            "truncated": list(self.truncated),
+        }
@@ -0,0 +1,142 @@
+"""
+Plano de recuperação de contexto para um turno de chat
+"""
+
+import os
+import time
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Dict, List, Optional
+
+from backend.services.deadline import Deadline, DeadlineExceeded
+from backend.services.embedding_service import (
+    embedding_service,
+    find_similar_documents,
+    find_similar_politicians,
+)
+from backend.services.keyword_search import search_documentos, search_politicos
+from backend.services.politico_index import politico_index
+
+logger = logging.getLogger(__name__)
+
+POLITICO_LIMIT = 2
+RETRIEVAL_MAX_SECONDS = float(os.getenv("RETRIEVAL_MAX_SECONDS", "10"))
+# a recuperação não pode consumir o prazo que a geração vai precisar
+RETRIEVAL_DEADLINE_SHARE = 0.3
+
+
+@dataclass
+class RetrievalPlan:
+    """Decide quais buscas rodam e qual é a primária em cada ramo."""
+    query: str
+    include_politicos: bool
+    prefer_embeddings: bool
+    politico_limit: int = POLITICO_LIMIT
+
+    @property
+    def document_limit(self) -> int:
+        return 5 if self.prefer_embeddings else 4
+
+
+@dataclass
+class RetrievalResult:
+    politicos: List[Dict[str, Any]]
+    documents: List[Dict[str, Any]]
+    query_embedding: Optional[List[float]] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+async def _timed(name: str, timings: Dict[str, float], coro: Awaitable[Any]) -> Any:
+    started = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        timings[name] = time.perf_counter() - started
+
+
+def _pick(primary: Any, fallback: Any, fallback_on_empty: bool) -> List[Dict[str, Any]]:
+    """
+    Mantém a política de fallback anterior: a busca secundária só é usada quando a
+    primária falha (ou volta vazia, no caso da busca por palavra-chave).
+    """
+    if isinstance(primary, BaseException):
+        logger.warning(f"Busca primária falhou: {primary}")
+        return [] if isinstance(fallback, BaseException) else fallback
+    if not primary and fallback_on_empty and not isinstance(fallback, BaseException):
+        return fallback
+    return primary
+
+
+async def retrieve(plan: RetrievalPlan, deadline: Optional[Deadline] = None) -> RetrievalResult:
+    """
+    Executa a recuperação de um turno: o embedding da consulta é calculado uma única
+    vez e as buscas por palavra-chave e vetoriais de políticos e documentos rodam
+    concorrentemente, de modo que a latência seja a do ramo mais lento. Com `deadline`,
+    a recuperação usa no máximo uma fração do prazo restante; ramos que não terminam
+    a tempo são cancelados e tratados como falha.
+    """
+    timings: Dict[str, float] = {}
+    started = time.perf_counter()
+
+    # nomes citados literalmente são resolvidos no índice em memória, sem buscas no banco
+    mentioned: List[Dict[str, Any]] = []
+    if plan.include_politicos:
+        try:
+            mentioned = (await _timed("politicos_index", timings, politico_index.find(plan.query)))[:plan.politico_limit]
+        except Exception as exc:
+            logger.warning(f"Índice de nomes indisponível: {exc}")
+
+    embedding_task = asyncio.ensure_future(
+        _timed("embedding", timings, embedding_service.get_query_embedding(plan.query))
+    )
+
+    async def vector_politicos() -> List[Dict[str, Any]]:
+        embedding = await embedding_task
+        return await find_similar_politicians(plan.query, limit=plan.politico_limit, query_embedding=embedding)
+
+    async def vector_documents() -> List[Dict[str, Any]]:
+        embedding = await embedding_task
+        return await find_similar_documents(plan.query, limit=plan.document_limit, query_embedding=embedding)
+
+    branches: Dict[str, Awaitable[Any]] = {
+        "documents_keyword": search_documentos(plan.query, plan.document_limit),
+        "documents_vector": vector_documents(),
+    }
+    if plan.include_politicos and not mentioned:
+        branches["politicos_keyword"] = search_politicos(plan.query, plan.politico_limit)
+        branches["politicos_vector"] = vector_politicos()
+
+    tasks = {name: asyncio.ensure_future(_timed(name, timings, coro)) for name, coro in branches.items()}
+    timeout = deadline.timeout(cap=RETRIEVAL_MAX_SECONDS, share=RETRIEVAL_DEADLINE_SHARE) if deadline else None
+    _, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+    if pending:
+        logger.warning(f"Recuperação cortada pelo prazo após {timeout:.1f}s: {len(pending)} buscas canceladas")
+        for task in pending:
+            task.cancel()
+        embedding_task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    results = {
+        name: DeadlineExceeded(name) if task.cancelled() else (task.exception() or task.result())
+        for name, task in tasks.items()
+    }
+
+    politicos: List[Dict[str, Any]] = mentioned
+    if plan.include_politicos and not mentioned:
+        if plan.prefer_embeddings:
+            politicos = _pick(results["politicos_vector"], results["politicos_keyword"], fallback_on_empty=False)
+        else:
+            politicos = _pick(results["politicos_keyword"], results["politicos_vector"], fallback_on_empty=True)
+
+    if plan.prefer_embeddings:
+        documents = _pick(results["documents_vector"], results["documents_keyword"], fallback_on_empty=False)
+    else:
+        documents = _pick(results["documents_keyword"], results["documents_vector"], fallback_on_empty=True)
+
+    query_embedding = None
+    if embedding_task.done() and not embedding_task.cancelled() and embedding_task.exception() is None:
+        query_embedding = embedding_task.result()
+
+    timings["total"] = time.perf_counter() - started
+    logger.debug(f"Recuperação concluída: {', '.join(f'{k}={v * 1000:.0f}ms' for k, v in timings.items())}")
+    return RetrievalResult(politicos=politicos, documents=documents, query_embedding=query_embedding, timings=timings)
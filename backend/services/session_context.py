@@ -0,0 +1,83 @@
+"""
+Contexto (tokens já processados) devolvido pelo Ollama, guardado por sessão para que
+turnos seguintes enviem apenas o trecho novo do prompt
+"""
+
+import os
+import logging
+from array import array
+from typing import Any, Dict, List, Optional
+
+from backend.services.memory_cache import MemoryCache
+
+logger = logging.getLogger(__name__)
+
+SESSION_CONTEXT_MAX_SESSIONS = int(os.getenv("SESSION_CONTEXT_MAX_SESSIONS", "512"))
+SESSION_CONTEXT_TTL = float(os.getenv("SESSION_CONTEXT_TTL", "1800"))
+SESSION_CONTEXT_MB = int(os.getenv("SESSION_CONTEXT_MB", "32"))
+
+NANOSECONDS = 1_000_000_000
+
+
+class SessionContextStore:
+    """
+    Contextos por sessão em LRU com TTL e limite de memória (tokens como uint32).
+    Também acumula o tempo de prefill dos turnos com e sem reaproveitamento.
+    """
+
+    def __init__(self) -> None:
+        self.cache = MemoryCache(
+            max_entries=SESSION_CONTEXT_MAX_SESSIONS,
+            ttl_seconds=SESSION_CONTEXT_TTL,
+            max_bytes=SESSION_CONTEXT_MB * 1024 * 1024,
+            sizeof=lambda entry: entry[1].itemsize * len(entry[1]),
+        )
+        self._prefill = {
+            "fresh": {"turns": 0, "tokens": 0, "seconds": 0.0},
+            "reused": {"turns": 0, "tokens": 0, "seconds": 0.0},
+        }
+
+    def get(self, session_id: str, model: str) -> Optional[List[int]]:
+        entry = self.cache.get(session_id)
+        if entry is None or entry[0] != model:
+            return None
+        return entry[1].tolist()
+
+    def length(self, session_id: str, model: str) -> int:
+        entry = self.cache.get(session_id, count=False)
+        if entry is None or entry[0] != model:
+            return 0
+        return len(entry[1])
+
+    def put(self, session_id: str, model: str, context: List[int]) -> None:
+        self.cache.set(session_id, (model, array("I", context)))
+
+    def drop(self, session_id: str) -> None:
+        self.cache.delete(session_id)
+
+    def record(self, session_id: str, data: Dict[str, Any], reused: bool) -> None:
+        """Registra o prefill informado pelo Ollama (`prompt_eval_*`) e loga o turno."""
+        tokens = int(data.get("prompt_eval_count") or 0)
+        seconds = (data.get("prompt_eval_duration") or 0) / NANOSECONDS
+        bucket = self._prefill["reused" if reused else "fresh"]
+        bucket["turns"] += 1
+        bucket["tokens"] += tokens
+        bucket["seconds"] += seconds
+        logger.info(
+            f"Prefill {'com' if reused else 'sem'} contexto - Session: {session_id[:8]}... - "
+            f"{tokens} tokens em {seconds * 1000:.0f}ms"
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        prefill = {
+            kind: {
+                "turns": b["turns"],
+                "avg_tokens": round(b["tokens"] / b["turns"], 1) if b["turns"] else 0.0,
+                "avg_ms": round(b["seconds"] * 1000 / b["turns"], 1) if b["turns"] else 0.0,
+            }
+            for kind, b in self._prefill.items()
+        }
+        return {"prefill": prefill, **self.cache.stats()}
+
+
+session_contexts = SessionContextStore()
@@ -0,0 +1,53 @@
+"""
+Coalescência de chamadas idênticas em andamento (single-flight)
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Garante no máximo uma execução em andamento por chave: chamadores concorrentes
+    com a mesma chave aguardam o mesmo resultado (ou a mesma exceção). A execução
+    roda numa task própria, então o cancelamento de um chamador não afeta os demais.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._calls: Dict[Hashable, Tuple["asyncio.Future[Any]", int]] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is not None:
+            task, waiters = call
+            self._calls[key] = (task, waiters + 1)
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = (task, 1)
+            self.executions += 1
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: "asyncio.Future[Any]") -> None:
+        self._calls.pop(key, None)
+        # todos os chamadores podem ter desistido (prazo esgotado); evita o aviso
+        # de exceção nunca lida da task
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        waiting = [waiters for _, waiters in self._calls.values()]
+        return {
+            "in_flight_keys": len(waiting),
+            "waiters": sum(waiting),
+            "max_waiters_per_key": max(waiting, default=0),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+        }
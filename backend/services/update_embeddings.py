@@ -3,11 +3,15 @@ Script para atualização de embeddings no sistema
 Execute periodicamente para manter embeddings atualizados
 """
 
-from backend.services.embedding_service import (
+from backend.services.embedding_backfill import (
     update_politician_embeddings, 
     update_document_embeddings,
+    reset_checkpoint,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_COMMIT_EVERY,
 )
 
+import argparse
 import asyncio
 import logging
 import sys
@@ -23,16 +27,35 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-async def main():
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Backfill de embeddings de políticos e documentos")
+    parser.add_argument("--only", choices=["politicos", "documentos"], help="Processa apenas uma das tabelas")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Linhas por lote de encode")
+    parser.add_argument("--commit-every", type=int, default=DEFAULT_COMMIT_EVERY, help="Lotes entre commits/checkpoints")
+    parser.add_argument("--force", action="store_true", help="Recalcula embeddings já existentes")
+    parser.add_argument("--reset", action="store_true", help="Descarta o checkpoint e recomeça do início")
+    return parser.parse_args(argv)
+
+async def main(argv=None):
     """Executa atualização completa de embeddings"""
+    args = parse_args(argv)
     logger.info("Iniciando atualização de embeddings...")
     
+    if args.reset:
+        reset_checkpoint()
+    
+    options = {"batch_size": args.batch_size, "commit_every": args.commit_every, "force": args.force}
+    
     try:
-        logger.info("Atualizando embeddings de políticos...")
-        await update_politician_embeddings()
+        if args.only in (None, "politicos"):
+            logger.info("Atualizando embeddings de políticos...")
+            stats = await update_politician_embeddings(**options)
+            logger.info(f"Políticos: {stats}")
         
-        logger.info("Atualizando embeddings de documentos...")
-        await update_document_embeddings()
+        if args.only in (None, "documentos"):
+            logger.info("Atualizando embeddings de documentos...")
+            stats = await update_document_embeddings(**options)
+            logger.info(f"Documentos: {stats}")
         
         logger.info("Atualização de embeddings concluída com sucesso!")
         
@@ -41,4 +64,4 @@ async def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
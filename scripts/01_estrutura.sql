@@ -180,10 +180,10 @@ CREATE INDEX IF NOT EXISTS idx_query_embeddings_hash ON query_embeddings_cache (
 CREATE INDEX IF NOT EXISTS idx_session_messages_session ON session_messages (session_id);
 CREATE INDEX IF NOT EXISTS idx_response_log_session ON response_log (session_id);
 
-CREATE INDEX IF NOT EXISTS politicos_embedding_idx ON politicos USING ivfflat (embedding_ideologia vector_l2_ops) WITH (lists = 100);
-CREATE INDEX IF NOT EXISTS documentos_embedding_idx ON documentos_politicos USING ivfflat (embedding_documento vector_l2_ops) WITH (lists = 100);
-CREATE INDEX IF NOT EXISTS usuarios_embedding_idx ON usuarios_perfis_ideologicos USING ivfflat (embedding_ideologia vector_l2_ops) WITH (lists = 100);
-CREATE INDEX IF NOT EXISTS politicos_bio_embedding_idx ON politicos USING ivfflat (embedding_biografia vector_l2_ops) WITH (lists = 100);
-CREATE INDEX IF NOT EXISTS documentos_titulo_embedding_idx ON documentos_politicos USING ivfflat (embedding_titulo vector_l2_ops) WITH (lists = 100);
-CREATE INDEX IF NOT EXISTS documentos_ementa_embedding_idx ON documentos_politicos USING ivfflat (embedding_ementa vector_l2_ops) WITH (lists = 100);
-CREATE INDEX IF NOT EXISTS query_embeddings_idx ON query_embeddings_cache USING ivfflat (embedding vector_l2_ops) WITH (lists = 100);
\ No newline at end of file
+-- índices vetoriais alinhados ao operador de cosseno (<=>) usado nas buscas
+CREATE INDEX IF NOT EXISTS politicos_embedding_idx ON politicos USING hnsw (embedding_ideologia vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+CREATE INDEX IF NOT EXISTS documentos_embedding_idx ON documentos_politicos USING hnsw (embedding_documento vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+CREATE INDEX IF NOT EXISTS usuarios_embedding_idx ON usuarios_perfis_ideologicos USING hnsw (embedding_ideologia vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+CREATE INDEX IF NOT EXISTS politicos_bio_embedding_idx ON politicos USING hnsw (embedding_biografia vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+CREATE INDEX IF NOT EXISTS documentos_titulo_embedding_idx ON documentos_politicos USING hnsw (embedding_titulo vector_cosine_ops) WITH (m = 16, ef_construction = 64);
+CREATE INDEX IF NOT EXISTS documentos_ementa_embedding_idx ON documentos_politicos USING hnsw (embedding_ementa vector_cosine_ops) WITH (m = 16, ef_construction = 64);
\ No newline at end of file
@@ -0,0 +1,65 @@
+\c iris_db;
+
+CREATE EXTENSION IF NOT EXISTS unaccent;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- colunas de busca textual
+ALTER TABLE politicos ADD COLUMN IF NOT EXISTS busca_tsv TSVECTOR;
+ALTER TABLE documentos_politicos ADD COLUMN IF NOT EXISTS busca_tsv TSVECTOR;
+
+-- nomes próprios não passam por stemming: dicionário 'simple' sem acentos
+CREATE OR REPLACE FUNCTION politicos_busca_tsv(p_nome TEXT, p_partido TEXT, p_uf TEXT)
+RETURNS TSVECTOR AS $$
+  SELECT setweight(to_tsvector('simple', unaccent(coalesce(p_nome, ''))), 'A') ||
+         setweight(to_tsvector('simple', unaccent(coalesce(p_partido, ''))), 'B') ||
+         setweight(to_tsvector('simple', unaccent(coalesce(p_uf, ''))), 'C');
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION documentos_busca_tsv(p_titulo TEXT, p_ementa TEXT, p_resumo TEXT, p_conteudo TEXT)
+RETURNS TSVECTOR AS $$
+  SELECT setweight(to_tsvector('portuguese', unaccent(coalesce(p_titulo, ''))), 'A') ||
+         setweight(to_tsvector('portuguese', unaccent(coalesce(p_ementa, ''))), 'B') ||
+         setweight(to_tsvector('portuguese', unaccent(coalesce(p_resumo, ''))), 'C') ||
+         setweight(to_tsvector('portuguese', unaccent(left(coalesce(p_conteudo, ''), 200000))), 'D');
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION update_politicos_busca_tsv()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.busca_tsv = politicos_busca_tsv(NEW.nome, NEW.partido, NEW.uf);
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION update_documentos_busca_tsv()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.busca_tsv = documentos_busca_tsv(NEW.titulo, NEW.ementa, NEW.resumo_simplificado, NEW.conteudo_original);
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- criando triggers
+DROP TRIGGER IF EXISTS trg_politicos_busca_tsv ON politicos;
+CREATE TRIGGER trg_politicos_busca_tsv
+  BEFORE INSERT OR UPDATE OF nome, partido, uf ON politicos
+  FOR EACH ROW EXECUTE PROCEDURE update_politicos_busca_tsv();
+
+DROP TRIGGER IF EXISTS trg_documentos_busca_tsv ON documentos_politicos;
+CREATE TRIGGER trg_documentos_busca_tsv
+  BEFORE INSERT OR UPDATE OF titulo, ementa, resumo_simplificado, conteudo_original ON documentos_politicos
+  FOR EACH ROW EXECUTE PROCEDURE update_documentos_busca_tsv();
+
+-- preenchendo linhas existentes
+UPDATE politicos
+SET busca_tsv = politicos_busca_tsv(nome, partido, uf)
+WHERE busca_tsv IS NULL;
+
+UPDATE documentos_politicos
+SET busca_tsv = documentos_busca_tsv(titulo, ementa, resumo_simplificado, conteudo_original)
+WHERE busca_tsv IS NULL;
+
+-- Criar indexes
+CREATE INDEX IF NOT EXISTS idx_politicos_busca_tsv ON politicos USING gin (busca_tsv);
+CREATE INDEX IF NOT EXISTS idx_documentos_busca_tsv ON documentos_politicos USING gin (busca_tsv);
+CREATE INDEX IF NOT EXISTS idx_politicos_nome_trgm ON politicos USING gin (nome gin_trgm_ops);
@@ -0,0 +1,39 @@
+\c iris_db;
+
+-- contador de versão por tabela, usado para invalidar caches da aplicação
+CREATE TABLE IF NOT EXISTS versoes_dados (
+  tabela TEXT PRIMARY KEY,
+  versao BIGINT NOT NULL DEFAULT 0,
+  atualizado_em TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE OR REPLACE FUNCTION incrementar_versao_dados()
+RETURNS TRIGGER AS $$
+BEGIN
+  INSERT INTO versoes_dados (tabela, versao, atualizado_em)
+  VALUES (TG_TABLE_NAME, 1, NOW())
+  ON CONFLICT (tabela) DO UPDATE
+    SET versao = versoes_dados.versao + 1,
+        atualizado_em = NOW();
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- um incremento por comando, não por linha
+DROP TRIGGER IF EXISTS trg_versao_politicos ON politicos;
+CREATE TRIGGER trg_versao_politicos
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON politicos
+  FOR EACH STATEMENT EXECUTE PROCEDURE incrementar_versao_dados();
+
+DROP TRIGGER IF EXISTS trg_versao_documentos_politicos ON documentos_politicos;
+CREATE TRIGGER trg_versao_documentos_politicos
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON documentos_politicos
+  FOR EACH STATEMENT EXECUTE PROCEDURE incrementar_versao_dados();
+
+DROP TRIGGER IF EXISTS trg_versao_votos_documento ON votos_documento;
+CREATE TRIGGER trg_versao_votos_documento
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON votos_documento
+  FOR EACH STATEMENT EXECUTE PROCEDURE incrementar_versao_dados();
+
+INSERT INTO versoes_dados (tabela) VALUES ('politicos'), ('documentos_politicos'), ('votos_documento')
+ON CONFLICT (tabela) DO NOTHING;
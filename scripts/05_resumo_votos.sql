@@ -0,0 +1,146 @@
+\c iris_db;
+
+-- agregados de votos por político, mantidos por triggers em votos_documento para que o
+-- chat leia totais e votações recentes numa única consulta pela chave primária
+CREATE TABLE IF NOT EXISTS politico_votos_resumo (
+  politico_id UUID PRIMARY KEY REFERENCES politicos(id) ON DELETE CASCADE,
+  total INTEGER NOT NULL DEFAULT 0,
+  sim INTEGER NOT NULL DEFAULT 0,
+  nao INTEGER NOT NULL DEFAULT 0,
+  abstencao INTEGER NOT NULL DEFAULT 0,
+  ausente INTEGER NOT NULL DEFAULT 0,
+  -- as 100 votações mais recentes, em ordem cronológica
+  recentes JSONB NOT NULL DEFAULT '[]'::jsonb,
+  atualizado_em TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- recalcula o resumo só dos políticos informados (usa idx_votos_documento_politico)
+CREATE OR REPLACE FUNCTION atualizar_resumo_votos(ids UUID[])
+RETURNS VOID AS $$
+BEGIN
+  DELETE FROM politico_votos_resumo r
+  WHERE r.politico_id = ANY(ids)
+    AND NOT EXISTS (SELECT 1 FROM votos_documento vd WHERE vd.politico_id = r.politico_id);
+
+  INSERT INTO politico_votos_resumo (politico_id, total, sim, nao, abstencao, ausente, recentes, atualizado_em)
+  SELECT p.pid, c.total, c.sim, c.nao, c.abstencao, c.ausente, rec.recentes, NOW()
+  FROM unnest(ids) AS p(pid)
+  JOIN politicos pol ON pol.id = p.pid
+  CROSS JOIN LATERAL (
+    SELECT COUNT(*) AS total,
+           COUNT(*) FILTER (WHERE v = 'SIM') AS sim,
+           COUNT(*) FILTER (WHERE v = 'NAO') AS nao,
+           COUNT(*) FILTER (WHERE v = 'ABSTENCAO') AS abstencao,
+           COUNT(*) FILTER (WHERE v = 'AUSENTE') AS ausente
+    FROM (SELECT upper(unaccent(vd.voto)) AS v FROM votos_documento vd WHERE vd.politico_id = p.pid) votos
+  ) c
+  CROSS JOIN LATERAL (
+    SELECT COALESCE(
+             jsonb_agg(
+               jsonb_build_object(
+                 'document_id', r.doc_id,
+                 'document_uuid', r.documento_uuid,
+                 'titulo', r.titulo,
+                 'voto', r.voto
+               )
+               ORDER BY r.criado ASC NULLS LAST, r.doc_id ASC
+             ),
+             '[]'::jsonb
+           ) AS recentes
+    FROM (
+      SELECT dp.id_documento_origem AS doc_id,
+             dp.id AS documento_uuid,
+             dp.titulo,
+             vd.voto,
+             dp.created_at AS criado
+      FROM votos_documento vd
+      JOIN documentos_politicos dp ON vd.documento_id = dp.id
+      WHERE vd.politico_id = p.pid
+      ORDER BY dp.created_at DESC NULLS FIRST, dp.id_documento_origem DESC
+      LIMIT 100
+    ) r
+  ) rec
+  WHERE c.total > 0
+  ON CONFLICT (politico_id) DO UPDATE
+    SET total = EXCLUDED.total,
+        sim = EXCLUDED.sim,
+        nao = EXCLUDED.nao,
+        abstencao = EXCLUDED.abstencao,
+        ausente = EXCLUDED.ausente,
+        recentes = EXCLUDED.recentes,
+        atualizado_em = EXCLUDED.atualizado_em;
+END;
+$$ LANGUAGE plpgsql;
+
+-- transition tables não aceitam triggers com mais de um evento: um trigger por operação,
+-- todos por comando, recalculando apenas os políticos afetados
+CREATE OR REPLACE FUNCTION resumo_votos_por_votos()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    PERFORM atualizar_resumo_votos(ARRAY(SELECT DISTINCT politico_id FROM novos));
+  ELSIF TG_OP = 'UPDATE' THEN
+    PERFORM atualizar_resumo_votos(ARRAY(SELECT politico_id FROM novos UNION SELECT politico_id FROM antigos));
+  ELSE
+    PERFORM atualizar_resumo_votos(ARRAY(SELECT DISTINCT politico_id FROM antigos));
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_resumo_votos_insert ON votos_documento;
+CREATE TRIGGER trg_resumo_votos_insert
+  AFTER INSERT ON votos_documento
+  REFERENCING NEW TABLE AS novos
+  FOR EACH STATEMENT EXECUTE PROCEDURE resumo_votos_por_votos();
+
+DROP TRIGGER IF EXISTS trg_resumo_votos_update ON votos_documento;
+CREATE TRIGGER trg_resumo_votos_update
+  AFTER UPDATE ON votos_documento
+  REFERENCING OLD TABLE AS antigos NEW TABLE AS novos
+  FOR EACH STATEMENT EXECUTE PROCEDURE resumo_votos_por_votos();
+
+DROP TRIGGER IF EXISTS trg_resumo_votos_delete ON votos_documento;
+CREATE TRIGGER trg_resumo_votos_delete
+  AFTER DELETE ON votos_documento
+  REFERENCING OLD TABLE AS antigos
+  FOR EACH STATEMENT EXECUTE PROCEDURE resumo_votos_por_votos();
+
+CREATE OR REPLACE FUNCTION resumo_votos_truncate()
+RETURNS TRIGGER AS $$
+BEGIN
+  TRUNCATE politico_votos_resumo;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_resumo_votos_truncate ON votos_documento;
+CREATE TRIGGER trg_resumo_votos_truncate
+  AFTER TRUNCATE ON votos_documento
+  FOR EACH STATEMENT EXECUTE PROCEDURE resumo_votos_truncate();
+
+-- título e data dos documentos aparecem nas votações recentes
+CREATE OR REPLACE FUNCTION resumo_votos_por_documentos()
+RETURNS TRIGGER AS $$
+BEGIN
+  PERFORM atualizar_resumo_votos(ARRAY(
+    SELECT DISTINCT vd.politico_id
+    FROM novos n
+    JOIN antigos a ON a.id = n.id
+    JOIN votos_documento vd ON vd.documento_id = n.id
+    WHERE n.titulo IS DISTINCT FROM a.titulo
+       OR n.created_at IS DISTINCT FROM a.created_at
+       OR n.id_documento_origem IS DISTINCT FROM a.id_documento_origem
+  ));
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_resumo_votos_documentos ON documentos_politicos;
+CREATE TRIGGER trg_resumo_votos_documentos
+  AFTER UPDATE ON documentos_politicos
+  REFERENCING OLD TABLE AS antigos NEW TABLE AS novos
+  FOR EACH STATEMENT EXECUTE PROCEDURE resumo_votos_por_documentos();
+
+-- carga inicial a partir dos votos já existentes
+SELECT atualizar_resumo_votos(ARRAY(SELECT DISTINCT politico_id FROM votos_documento));
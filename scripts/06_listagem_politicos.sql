@@ -0,0 +1,5 @@
+\c iris_db;
+
+-- paginação por cursor da listagem de políticos: ORDER BY nome, id com WHERE (nome, id) > cursor
+CREATE INDEX IF NOT EXISTS idx_politicos_nome_id ON politicos (nome, id);
+CREATE INDEX IF NOT EXISTS idx_politicos_uf ON politicos (uf);